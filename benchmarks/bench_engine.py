@@ -0,0 +1,109 @@
+from time import perf_counter
+
+import numpy as np
+
+from play2048 import kernels
+from play2048.bitboard import BitBoard2048
+from play2048.board import Board2048
+from play2048.player import AIPlayer
+
+from .common import SIZES, measure, midgame_board
+
+# Description: Benchmarks of the board engine: moves, spawns, game over checks and complete random games,
+# for all board sizes in SIZES (and for the 4x4 bitboard engine). The slide kernels are benchmarked on
+# larger boards (KERNEL_SIZES).
+
+GAME_TIME = 1.0     # Time spent playing random games per board size (in seconds)
+
+KERNEL_SIZES = (16, 32, 64)
+
+
+def bench_move(size:int, engine:str='board') -> dict:
+    board = midgame_board(size)
+    if engine == 'bitboard':
+        board = BitBoard2048.from_array(board.board)
+
+    def run():
+        for move_id in (1, 2, 3, 4):
+            board.move(move_id)
+
+    return measure('move', run, ops=4, size=size, engine=engine)
+
+
+def bench_spawn(size:int, engine:str='board') -> dict:
+    board = Board2048(size, seed=0) if engine == 'board' else BitBoard2048(size, seed=0)
+    empty = np.zeros((size, size), dtype=int)
+    num_squares = size * size
+
+    # Fill up an empty board
+    def run():
+        if engine == 'board':
+            board.load(empty)
+        else:
+            board.packed = 0
+        for _ in range(num_squares):
+            board.add_tile()
+
+    return measure('spawn', run, ops=num_squares, size=size, engine=engine)
+
+
+def bench_gameover(size:int, engine:str='board') -> dict:
+    board = midgame_board(size, fill=0.9)
+    if engine == 'bitboard':
+        board = BitBoard2048.from_array(board.board)
+    return measure('gameover', board.gameover, size=size, engine=engine)
+
+
+# Sliding all the lines of a board with a kernel, or with slide_line one line at a time (the cost of
+# a move on a large board whose lines all miss the slide cache)
+# (random lines with half of the squares occupied, since random moves take too long to fill large boards)
+def bench_slide_lines(size:int, kernel:str='reference') -> dict:
+    rng = np.random.default_rng(0)
+    lines = rng.integers(1, 8, (size, size)).astype(np.int8)
+    lines[rng.random((size, size)) < 0.5] = 0
+    slide = {'reference': kernels.slide_lines_reference, 'numpy': kernels.slide_lines_numpy,
+             'numba': kernels.slide_lines}[kernel]
+    slide(lines)    # Compile the numba kernel before timing it
+    return measure('slide_lines', lambda: slide(lines), size=size, kernel=kernel)
+
+
+# Random games played directly on the engine (without a Game), for a fixed amount of time
+# Large boards may not finish a single game, so the throughput is also reported in moves per second
+def bench_random_games(size:int, engine:str='board', duration:float=GAME_TIME) -> dict:
+    player = AIPlayer()
+    games = moves = 0
+    seed = 0
+
+    def new_board():
+        board = Board2048(size, seed=seed) if engine == 'board' else BitBoard2048(size, seed=seed)
+        board.add_tile()
+        board.add_tile()
+        return board
+
+    board = new_board()
+    start = perf_counter()
+    while perf_counter() - start < duration:
+        if board.move(player.next_move(board)):
+            board.add_tile()
+            moves += 1
+        if board.gameover():
+            games += 1
+            seed += 1
+            board = new_board()
+    elapsed = perf_counter() - start
+
+    return {'name': 'random_game', 'size': size, 'engine': engine,
+            'games_per_sec': games / elapsed, 'moves_per_sec': moves / elapsed}
+
+
+# Generator that runs all the benchmarks and yields their results
+def run(sizes=SIZES):
+    for size in sizes:
+        engines = ['board', 'bitboard'] if size == 4 else ['board']
+        for engine in engines:
+            for bench in (bench_move, bench_spawn, bench_gameover, bench_random_games):
+                yield bench(size, engine)
+
+    for size in KERNEL_SIZES:
+        for kernel in ['reference', 'numpy'] + (['numba'] if kernels.ACCELERATED else []):
+            yield bench_slide_lines(size, kernel)
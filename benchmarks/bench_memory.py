@@ -0,0 +1,72 @@
+import tracemalloc
+
+from play2048.board import Board2048
+
+# Description: Memory benchmark for Board2048. Measures the memory held by a board (for a board created
+# from scratch, with its own random number streams, and for a copy as used by search players) and the
+# memory allocated by a single move (the peak of the transient allocations, averaged over many moves).
+#
+# Run from the root of the repository as
+#
+#   python -m benchmarks.bench_memory
+#
+# Results (CPython 3.11, NumPy 2.4), before and after the switch to slotted boards with int8 storage,
+# line data shared between boards of the same size and preallocated buffers in move:
+#
+#                               4x4 before   4x4 after   8x8 before   8x8 after
+#   bytes per new board            11589        2893        29116        3366
+#   bytes per board copy             n/a         600          n/a        1080
+#   bytes allocated per move        4169        1780         6261        3622
+#
+# A new board is dominated by its random number streams. Copies share the streams of the original until
+# their first new tile, when they clone them (about 2300 bytes more, and 100-200 us on a slow machine).
+
+NUM_BOARDS = 10000
+NUM_MOVES = 10000
+
+
+# Function to measure the memory held by each of the boards returned by factory
+def bytes_per_board(factory, n:int=NUM_BOARDS) -> float:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    boards = [factory() for _ in range(n)]
+    held = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del boards
+    return held / n
+
+
+# Function to measure the average peak of the memory allocated by a single move
+def bytes_per_move(size:int, n:int=NUM_MOVES) -> float:
+    board = Board2048(size, seed=0)
+    board.add_tile()
+    board.add_tile()
+
+    total = 0
+    tracemalloc.start()
+    for i in range(n):
+        if board.gameover():
+            board = Board2048(size, seed=i)
+            board.add_tile()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tile_moves = board.move(i % 4 + 1)
+        total += tracemalloc.get_traced_memory()[1] - current
+        if tile_moves:
+            board.add_tile()
+    tracemalloc.stop()
+    return total / n
+
+
+def main():
+    for size in (4, 8):
+        print(f"Board size {size}")
+        print(f"  bytes per new board:    {bytes_per_board(lambda: Board2048(size)):8.0f}")
+        if hasattr(Board2048, 'copy'):
+            parent = Board2048(size)
+            print(f"  bytes per board copy:   {bytes_per_board(parent.copy):8.0f}")
+        print(f"  bytes allocated/move:   {bytes_per_move(size):8.0f}")
+
+
+if __name__ == "__main__":
+    main()
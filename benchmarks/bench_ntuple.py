@@ -0,0 +1,45 @@
+import numpy as np
+
+from play2048.ntuple import NTupleNetwork
+
+from .common import SIZES, measure, midgame_board
+
+# Description: Benchmarks of the n-tuple network: the value of a single board (as used inside a search),
+# the values of a batch of boards and a TD update. The cost of a lookup does not depend on the weights,
+# so a network of zeros is used.
+
+BATCH_SIZE = 1024
+
+# The default tuples cover 3 rows and 4 columns
+MIN_SIZE = 4
+
+
+# Random boards with exponents up to 11, as a (BATCH_SIZE, size, size) stack
+def random_boards(size:int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 12, (BATCH_SIZE, size, size)).astype(np.int8)
+
+
+def bench_value(size:int, net:NTupleNetwork) -> dict:
+    board = midgame_board(size).board
+    return measure('ntuple_value', lambda: net.value(board), size=size)
+
+
+def bench_values(size:int, net:NTupleNetwork) -> dict:
+    boards = random_boards(size)
+    return measure('ntuple_values', lambda: net.values(boards), ops=BATCH_SIZE, size=size, batch_size=BATCH_SIZE)
+
+
+def bench_update(size:int, net:NTupleNetwork) -> dict:
+    board = midgame_board(size).board
+    return measure('ntuple_update', lambda: net.update(board, 0.0), size=size)
+
+
+# Generator that runs all the benchmarks and yields their results
+def run(sizes=SIZES):
+    for size in sizes:
+        if size < MIN_SIZE:
+            continue
+        net = NTupleNetwork(size)
+        for bench in (bench_value, bench_values, bench_update):
+            yield bench(size, net)
@@ -0,0 +1,71 @@
+import numpy as np
+
+from play2048.cli import ANIM_DURATION, FRAME_TIME, SYMBOLS, _MoveAnimation
+
+from .common import SIZES, FakeCLI, measure, midgame_board
+
+# Description: Benchmarks of the terminal interface, drawing into a fake curses window. Animations are
+# drawn frame by frame without waiting between the frames, so that only the cost of the drawing is measured.
+
+NUM_FRAMES = round(ANIM_DURATION / FRAME_TIME)
+
+
+def bench_draw_board(size:int) -> dict:
+    cli = FakeCLI(size)
+    tiles = midgame_board(size).board
+    return measure('draw_board', lambda: cli.draw_board(tiles), size=size)
+
+
+def bench_make_move(size:int) -> dict:
+    cli = FakeCLI(size)
+    board = midgame_board(size)
+
+    # Pick the move that moves the largest number of tiles
+    best = None
+    for move_id in (1, 2, 3, 4):
+        child = board.copy()
+        tile_moves = child.move(move_id)
+        if best is None or len(tile_moves) > len(best[2]):
+            best = (move_id, child, tile_moves)
+    move_id, child, tile_moves = best
+
+    # Same sequence of drawing calls as CLI.make_move, when every frame is drawn
+    def animate():
+        anim = _MoveAnimation(cli, board.board, child.board, move_id, tile_moves)
+        for frame in range(1, NUM_FRAMES + 1):
+            anim.draw(frame / NUM_FRAMES)
+            cli._flush()
+        anim.draw_merges()
+        cli._flush()
+        anim.draw_final()
+        cli._flush()
+
+    return measure('make_move', animate, size=size)
+
+
+# Drawing every tile of a board with its gridlines, either from the sprite cache (as CLI._draw_tile does)
+# or with the uncached drawing routines, which build the strings of the tile on every call
+def bench_draw_tiles(size:int) -> dict:
+    cli = FakeCLI(size)
+    tiles = [((i,j), SYMBOLS[int(exp)]) for (i,j), exp in np.ndenumerate(midgame_board(size).board)]
+
+    def draw_cached():
+        for ind, txt in tiles:
+            cli._draw_tile(ind, txt, cli.tile_attr, draw_border=True)
+
+    def draw_uncached():
+        for ind, txt in tiles:
+            pos = cli._pos_from_ind(ind)
+            cli._draw_tile_border(pos, cli.grid_attr, corners=cli._comp_corners(ind))
+            cli._add_tile_text(pos, txt, cli.tile_attr)
+
+    yield measure('draw_tile', draw_cached, ops=len(tiles), size=size, path='sprite')
+    yield measure('draw_tile', draw_uncached, ops=len(tiles), size=size, path='direct')
+
+
+# Generator that runs all the benchmarks and yields their results
+def run(sizes=SIZES):
+    for size in sizes:
+        for bench in (bench_draw_board, bench_make_move):
+            yield bench(size)
+        yield from bench_draw_tiles(size)
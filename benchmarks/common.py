@@ -0,0 +1,106 @@
+import curses
+from time import perf_counter
+
+import numpy as np
+
+from play2048.board import Board2048
+from play2048.cli import CLI
+
+# Description: Helpers shared by the benchmarks: a timer, random mid-game positions and a CLI that
+# draws into a fake curses window (so that the rendering cost can be measured without a terminal).
+
+MIN_TIME = 0.2      # Minimum duration of a single timing run (in seconds)
+REPEATS = 3         # Number of timing runs (the best one is reported)
+
+SIZES = range(2, 9)
+
+
+# Function to time fn (which performs ops operations per call) and return a result record
+# The reported time is the best of several runs, each lasting at least min_time
+def measure(name:str, fn, ops:int=1, min_time:float=MIN_TIME, repeats:int=REPEATS, **params) -> dict:
+    best = float('inf')
+    for _ in range(repeats):
+        calls = 0
+        start = perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / (calls * ops))
+
+    return {'name': name, **params, 'ops_per_sec': 1.0 / best, 'us_per_op': 1e6 * best}
+
+
+# Function to play random moves on a seeded board until a fraction fill of the squares is occupied
+def midgame_board(size:int, fill:float=0.5, seed:int=0) -> Board2048:
+    rng = np.random.default_rng(seed)
+    board = Board2048(size, seed=seed)
+    board.add_tile()
+    board.add_tile()
+    while len(board.free) > (1 - fill) * size * size and not board.gameover():
+        if board.move(int(rng.integers(1, 5))):
+            board.add_tile()
+    return board
+
+
+# Fake curses window that accepts (and counts) all the drawing calls
+class FakeWindow:
+    def __init__(self, height:int=1000, width:int=1000):
+        self.height, self.width = height, width
+        self.num_addstr = 0
+        self.num_refresh = 0
+
+    def addstr(self, *args):
+        self.num_addstr += 1
+
+    def refresh(self):
+        self.num_refresh += 1
+
+    def noutrefresh(self):
+        self.num_refresh += 1
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def derwin(self, *args):
+        return self
+
+    def border(self, *args):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def timeout(self, delay):
+        pass
+
+    def getch(self):
+        return -1
+
+
+# CLI drawing into a FakeWindow. Only the terminal setup is skipped; all drawing routines are the real ones.
+class FakeCLI(CLI):
+    def __init__(self, size:int, human:bool=True):
+        self.size = size
+        self.human = human
+        self.scr = FakeWindow()
+        self.scr_height, self.scr_width = self.scr.getmaxyx()
+        self._comp_lengths()
+
+        # Plain attributes, since colors cannot be initialized without a terminal
+        for name in ('tile', 'new_tile', 'mov_tile', 'merged_tile', 'wild_tile', 'title', 'score', 'msg', 'err', 'grid'):
+            setattr(self, f'{name}_attr', curses.A_BOLD)
+        self._init_sprites()
+
+        self.shown = {}
+        self._create_windows()
+        self._draw_banner()
+        self._draw_grid()
+
+    def _update_screen(self):
+        self.scr.num_refresh += 1
+
+    def __del__(self):
+        pass
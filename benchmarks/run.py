@@ -0,0 +1,64 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import bench_engine, bench_ntuple, bench_render
+from .common import SIZES
+
+# Description: Runs the benchmark suite and writes the results as JSON, so that they can be compared
+# from release to release. Run from the root of the repository as
+#
+#   python -m benchmarks.run --output bench.json
+#
+# Every result is a record with the name of the benchmark, its parameters (board size, engine) and the
+# measured throughput (ops_per_sec and us_per_op, or games_per_sec and moves_per_sec for full games).
+
+SUITES = {'engine': bench_engine, 'ntuple': bench_ntuple, 'render': bench_render}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Run the play2048 benchmarks")
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", help="suite to run (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="board sizes")
+    parser.add_argument("--output", help="JSON file for the results (default: standard output)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.suite or sorted(SUITES):
+        for result in SUITES[name].run(args.sizes):
+            result['suite'] = name
+            results.append(result)
+            print(result, file=sys.stderr)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
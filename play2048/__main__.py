@@ -1,4 +1,82 @@
+import argparse
+import inspect
+import random
+from collections import Counter
+from time import perf_counter
+
+from .board import DEFAULT_SIZE
 from .game import Game
+from .history import DEFAULT_DEPTH
+from .player import AIPlayer
+from .profiling import print_breakdown, profile_call
+from .tournament import load_player
+
+
+parser = argparse.ArgumentParser(prog="python -m play2048", description="Play 2048 in the terminal")
+parser.add_argument("--ai", action="store_true", help="let the AIPlayer make the moves")
+parser.add_argument("--player", help="AI player class as module:Class (implies --ai)")
+parser.add_argument("--headless", action="store_true", help="run without a terminal interface (requires --ai)")
+parser.add_argument("--games", type=int, default=1, help="number of games to play in headless mode")
+parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="size of the board")
+parser.add_argument("--seed", type=int, help="seed of the first game (the games are random by default)")
+parser.add_argument("--bitboard", action="store_true", help="use the packed 4x4 bitboard engine")
+parser.add_argument("--undo-depth", type=int, default=DEFAULT_DEPTH, help="number of moves that can be undone")
+parser.add_argument("--replay", help="record the game to a replay file (see python -m play2048.replay)")
+parser.add_argument("--profile", nargs="?", const="play2048.prof", metavar="FILE",
+                    help="run under cProfile, write the statistics to FILE (default: play2048.prof) "
+                         "and print the time spent in each subsystem")
+args = parser.parse_args()
+
+player_cls = load_player(args.player) if args.player else None
+args.ai = args.ai or player_cls is not None
+
+# A fresh player for every game (None selects the default AIPlayer)
+def make_player():
+    return player_cls() if player_cls is not None else None
+
+# Seed of the n-th game. Players that use the module-level random number generator are seeded as well.
+def game_seed(n:int):
+    if args.seed is None:
+        return None
+    random.seed(args.seed + n)
+    return args.seed + n
+
+if args.headless and not args.ai:
+    parser.error("--headless requires --ai")
+if args.replay and args.games > 1:
+    parser.error("--replay records a single game (use the tournament runner with --replay-dir for many games)")
+
+
+def play():
+    game = Game(size=args.size, ai=args.ai, bitboard=args.bitboard, player=make_player(), seed=game_seed(0),
+                replay=args.replay, undo_depth=args.undo_depth)
+    game.play()
+
+
+def play_headless():
+    max_tiles = Counter()
+    total_moves = total_score = 0
+
+    start = perf_counter()
+    for n in range(args.games):
+        result = Game(size=args.size, ai=True, bitboard=args.bitboard, headless=True, player=make_player(),
+                      seed=game_seed(n), replay=args.replay).run()
+        max_tiles[result.max_tile] += 1
+        total_moves += result.moves
+        total_score += result.score
+    elapsed = perf_counter() - start
+
+    print(f"Played {args.games} games in {elapsed:.2f}s ({args.games/elapsed:.1f} games/s)")
+    print(f"Mean moves: {total_moves/args.games:.1f}, mean score: {total_score/args.games:.1f}")
+    for tile in sorted(max_tiles):
+        print(f"  {tile:>6}: {max_tiles[tile]}")
+
+
+run = play_headless if args.headless else play
 
-game = Game()
-game.play()
\ No newline at end of file
+if args.profile:
+    # The breakdown is printed after the terminal interface has been closed
+    profile_call(args.profile, run)
+    print_breakdown(args.profile, ai_files=[inspect.getfile(player_cls or AIPlayer)])
+else:
+    run()
@@ -0,0 +1,163 @@
+import numpy as np
+
+from .board import DEFAULT_SIZE
+from .rng import PROB_TWO
+
+# Description: This file contains the BatchBoard class, which advances many 2048 games in lockstep.
+# The boards are stored as an (N, size, size) array of exponents (as in Board2048.board) and every
+# operation acts on all the boards at once, without a Python loop over the boards.
+
+
+# Functions to bring a stack of boards into the orientation in which a move slides the tiles along the
+# last axis towards index 0 (the scan order of Board2048.move), and back. All of them return views.
+def _orient(boards, move_id):
+    match move_id:
+        case 1:
+            return boards.transpose(0, 2, 1)
+        case 2:
+            return boards
+        case 3:
+            return boards.transpose(0, 2, 1)[:, :, ::-1]
+        case 4:
+            return boards[:, :, ::-1]
+        case _:
+            raise ValueError("Invalid move!")
+
+
+def _unorient(lines, move_id):
+    match move_id:
+        case 1:
+            return lines.transpose(0, 2, 1)
+        case 2:
+            return lines
+        case 3:
+            return lines[:, :, ::-1].transpose(0, 2, 1)
+        case 4:
+            return lines[:, :, ::-1]
+        case _:
+            raise ValueError("Invalid move!")
+
+
+# Function to move the entries of each line flagged in keep to the front (preserving their order)
+# The remaining entries are filled with zeros
+def _compact(lines, keep):
+    # A stable sort on the inverted mask moves the kept entries to the front
+    order = np.argsort(~keep, axis=-1, kind='stable')
+    out = np.take_along_axis(lines, order, axis=-1)
+    out[~np.take_along_axis(keep, order, axis=-1)] = 0
+    return out
+
+
+# Function to slide an (M, L, size) stack of lines towards index 0 of the last axis
+# Follows the rules of Board2048.move: each tile merges at most once, with the nearest tile
+# (in the scan order) of the same value, and the merged tile has an exponent one larger.
+# Returns the new lines and the score of every line (the sum of the values of the merged tiles)
+def slide_lines(lines):
+    size = lines.shape[-1]
+    packed = _compact(lines, lines != 0)
+
+    keep = packed != 0
+    merged = np.zeros(packed.shape[:-1], dtype=bool)
+    scores = np.zeros(packed.shape[:-1], dtype=np.int64)
+
+    # The merges are resolved sequentially along the line, but in parallel over all the lines
+    for k in range(size - 1):
+        cur, nxt = packed[..., k], packed[..., k+1]
+        merge = ~merged & (cur != 0) & (cur == nxt)
+        cur[merge] += 1
+        scores[merge] += np.left_shift(1, cur[merge])
+        keep[..., k+1] &= ~merge
+        merged = merge
+
+    # A merged wildcard pair has exponent 0, so the kept mask (rather than the value) decides the layout
+    return _compact(packed, keep), scores
+
+
+class BatchBoard:
+    # The seed can be an integer or a numpy SeedSequence (None draws a fresh seed from the OS)
+    def __init__(self, num_boards:int, size:int=DEFAULT_SIZE, seed=None):
+        if size < 2:
+            raise ValueError("Board size must be at least 2")
+
+        self.num_boards = num_boards
+        self.size = size
+        self.boards = np.zeros((num_boards, size, size), dtype=int)
+        self.scores = np.zeros(num_boards, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+
+    # Function to apply a vector of moves (one move ID in 1,2,3,4 per board)
+    # Boards with a move ID of 0 are left untouched. Returns a boolean array that flags the boards
+    # that changed, i.e. the boards for which Board2048.move would return a nonempty list of moves.
+    # The scores of the moves are added to self.scores.
+    def move(self, moves) -> np.ndarray:
+        moves = np.asarray(moves)
+        if moves.shape != (self.num_boards,):
+            raise ValueError(f"Expected {self.num_boards} moves, got an array of shape {moves.shape}")
+
+        valid = np.zeros(self.num_boards, dtype=bool)
+
+        for move_id in (1, 2, 3, 4):
+            ind = np.flatnonzero(moves == move_id)
+            if len(ind) == 0:
+                continue
+
+            old = self.boards[ind]
+            lines, scores = slide_lines(_orient(old, move_id))
+            new = _unorient(lines, move_id)
+
+            valid[ind] = (new != old).any(axis=(1, 2))
+            self.boards[ind] = new
+            self.scores[ind] += scores.sum(axis=1)
+
+        return valid
+
+
+    # Function to add a new tile at a random empty square of every board flagged in mask
+    # (all boards by default). Boards without an empty square are skipped.
+    # Returns the flat position of the new tile on each board (-1 if none was added) and the tiles
+    def add_tile(self, mask=None):
+        flat = self.boards.reshape(self.num_boards, -1)
+        free = flat == 0
+        num_free = free.sum(axis=1)
+
+        todo = num_free > 0
+        if mask is not None:
+            todo &= mask
+
+        # Pick the k-th free square of each board, with k uniform in [0, num_free)
+        k = (self.rng.random(self.num_boards) * num_free).astype(int)
+        pos = np.argmax(np.cumsum(free, axis=1) > k[:, None], axis=1)
+        tiles = np.where(self.rng.random(self.num_boards) < PROB_TWO, 1, 2)
+
+        ind = np.flatnonzero(todo)
+        flat[ind, pos[ind]] = tiles[ind]
+
+        pos[~todo] = -1
+        tiles[~todo] = 0
+        return pos, tiles
+
+
+    # Function to flag the valid moves of every board, as an (N, 4) boolean array whose column m-1 is
+    # the move ID m (see Board2048.can_move)
+    def legal_moves(self) -> np.ndarray:
+        legal = np.zeros((self.num_boards, 4), dtype=bool)
+        for move_id in (1, 2, 3, 4):
+            lines = _orient(self.boards, move_id)
+            ahead, tiles = lines[:, :, :-1], lines[:, :, 1:]
+            legal[:, move_id-1] = ((tiles != 0) & ((ahead == 0) | (ahead == tiles))).any(axis=(1, 2))
+        return legal
+
+
+    # Function to check which of the games are over (no valid moves left)
+    def gameover(self) -> np.ndarray:
+        b = self.boards
+        has_free = (b == 0).any(axis=(1, 2))
+        horz_pairs = (b[:, :, 1:] == b[:, :, :-1]).any(axis=(1, 2))
+        vert_pairs = (b[:, 1:, :] == b[:, :-1, :]).any(axis=(1, 2))
+        return ~(has_free | horz_pairs | vert_pairs)
+
+
+    # Function to compute the list of free tiles on board n
+    def list_free_tiles(self, n:int):
+        return [tuple(int(x) for x in pos) for pos in np.argwhere(self.boards[n] == 0)]
@@ -0,0 +1,273 @@
+import numpy as np
+
+from .rng import SpawnRNG
+from .slidecache import slide_line
+
+# Description: This file contains the BitBoard2048 class, a drop-in replacement for Board2048 for the
+# standard 4x4 game. The board is packed into a single 64-bit integer with one nibble (the log2 exponent)
+# per cell, and moves are applied one row at a time through precomputed 65536-entry lookup tables.
+#
+# Layout: the cell (i,j) occupies the nibble 4*i + j, i.e. bits 16*i + 4*j to 16*i + 4*j + 3.
+# Since every cell has only 4 bits, the wildcard tile (-1) cannot be represented and the largest tile
+# is 2**15. Two 2**15 tiles are never merged.
+
+SIZE = 4
+MAX_EXPONENT = 15
+
+ROW_MASK = 0xFFFF
+NIBBLE_ONES = 0x1111111111111111
+
+# For every move ID: (transpose the board before sliding rows, read each row in reverse order)
+# The rows of the transposed board are the columns of the original board
+DIRECTIONS = {1: (True, False), 2: (False, False), 3: (True, True), 4: (False, True)}
+
+
+# Lookup tables, indexed by a 16-bit row whose nibble k is the k-th tile in the scan direction:
+#  - ROW_LEFT: the row after sliding towards nibble 0
+#  - ROW_SCORE: the sum of the values of the merged tiles
+#  - ROW_MOVES: tuple of (source, destination, merge_flag) entries in line coordinates
+#  - ROW_REVERSE: the row with the order of its nibbles reversed
+ROW_LEFT = None
+ROW_SCORE = None
+ROW_MOVES = None
+ROW_REVERSE = None
+
+# LINE_CELLS[move_id][l][k] is the board index of the k-th tile in the scan direction of line l
+LINE_CELLS = {
+    1: [[(k, l) for k in range(SIZE)] for l in range(SIZE)],
+    2: [[(l, k) for k in range(SIZE)] for l in range(SIZE)],
+    3: [[(SIZE-1-k, l) for k in range(SIZE)] for l in range(SIZE)],
+    4: [[(l, SIZE-1-k) for k in range(SIZE)] for l in range(SIZE)],
+}
+
+
+# Function to build the lookup tables (done once, the first time a BitBoard2048 is created)
+def _build_tables():
+    global ROW_LEFT, ROW_SCORE, ROW_MOVES, ROW_REVERSE
+    if ROW_LEFT is not None:
+        return
+
+    row_left = [0] * (ROW_MASK + 1)
+    row_score = [0] * (ROW_MASK + 1)
+    row_moves = [()] * (ROW_MASK + 1)
+    row_reverse = [0] * (ROW_MASK + 1)
+
+    # There are only a few hundred distinct move patterns, so they are shared between rows
+    interned = {}
+
+    for row in range(ROW_MASK + 1):
+        cells = [(row >> (4*k)) & 0xF for k in range(SIZE)]
+        out, moves, score = slide_line(cells, MAX_EXPONENT)
+
+        row_left[row] = sum(val << (4*k) for k, val in enumerate(out))
+        row_score[row] = score
+        row_moves[row] = interned.setdefault(moves, moves)
+        row_reverse[row] = sum(val << (4*(SIZE-1-k)) for k, val in enumerate(cells))
+
+    ROW_LEFT, ROW_SCORE, ROW_MOVES, ROW_REVERSE = row_left, row_score, row_moves, row_reverse
+
+
+# Function to transpose a packed board (swaps the nibbles (i,j) and (j,i))
+def transpose(x:int) -> int:
+    a1 = x & 0xF0F00F0FF0F00F0F
+    a2 = x & 0x0000F0F00000F0F0
+    a3 = x & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+# Function to pack a 4x4 array of exponents into an integer
+def pack(board) -> int:
+    x = 0
+    for i in range(SIZE):
+        for j in range(SIZE):
+            val = int(board[i, j])
+            if val < 0 or val > MAX_EXPONENT:
+                raise ValueError(f"Tile exponent {val} cannot be stored in a bitboard!")
+            x |= val << (16*i + 4*j)
+    return x
+
+
+# Function to unpack an integer into a 4x4 array of exponents
+def unpack(x:int) -> np.ndarray:
+    return np.array([[(x >> (16*i + 4*j)) & 0xF for j in range(SIZE)] for i in range(SIZE)], dtype=int)
+
+
+class BitBoard2048:
+    def __init__(self, size=SIZE, seed=None):
+        if size != SIZE:
+            raise ValueError(f"BitBoard2048 only supports boards of size {SIZE}")
+        _build_tables()
+
+        self.size = size
+        self.packed = 0
+        self.prev_packed = 0
+        self.score = 0
+        self.prev_score = 0
+
+        self.rng = SpawnRNG(seed)
+
+
+    @classmethod
+    def from_array(cls, board, seed=None):
+        bboard = cls(len(board), seed)
+        bboard.packed = bboard.prev_packed = pack(board)
+        return bboard
+
+
+    # Function to replace the contents of the board (e.g. to restore a position from the history)
+    def load(self, board, score:int=None) -> None:
+        self.packed = pack(board)
+        if score is not None:
+            self.score = score
+
+
+    # The unpacked boards, for the graphics engine and for code written against Board2048
+    @property
+    def board(self) -> np.ndarray:
+        return unpack(self.packed)
+
+    @property
+    def prev_board(self) -> np.ndarray:
+        return unpack(self.prev_packed)
+
+
+    def __str__(self):
+        return '\n'.join([' '.join([str(cell) for cell in row]) for row in self.board])
+
+
+    # Function to add a new tile at a random empty square
+    # For the same seed, the new tiles are the same as in Board2048.add_tile
+    def add_tile(self):
+        free_tiles = self.list_free_tiles()
+
+        ind, tile = self.rng.draw(len(free_tiles))
+        pos = free_tiles[ind]
+        self.place_tile(pos, tile)
+        return pos, tile
+
+
+    # Function to put a given tile at the empty square pos = (i,j)
+    def place_tile(self, pos:tuple, tile:int) -> None:
+        shift = 16*pos[0] + 4*pos[1]
+        if (self.packed >> shift) & 0xF:
+            raise ValueError(f"Square {pos} is not empty!")
+        self.packed |= tile << shift
+
+
+    # Function to compute the list of free tiles on the board (in the same order as Board2048)
+    def list_free_tiles(self):
+        x = self.packed
+        return [ (i,j)
+            for i in range(SIZE)
+            for j in range(SIZE)
+            if (x >> (16*i + 4*j)) & 0xF == 0 ]
+
+
+    # Function to check if a move is valid without performing it: some row (in the direction of the move)
+    # changes on sliding
+    def can_move(self, move) -> bool:
+        try:
+            transposed, reverse = DIRECTIONS[move]
+        except KeyError:
+            raise ValueError("Invalid move!")
+
+        x = transpose(self.packed) if transposed else self.packed
+        for l in range(SIZE):
+            row = (x >> (16*l)) & ROW_MASK
+            line = ROW_REVERSE[row] if reverse else row
+            if ROW_LEFT[line] != line:
+                return True
+        return False
+
+
+    # Function to list the valid moves (in the order of the move IDs)
+    def legal_moves(self) -> list[int]:
+        return [move_id for move_id in (1, 2, 3, 4) if self.can_move(move_id)]
+
+
+    # Function to compute the result of a move without changing the board
+    # Returns the new board array and the score of the move, or None if the move is invalid
+    def peek_move(self, move):
+        if not self.can_move(move):
+            return None
+        new_x, score, _ = self._slide(move, with_moves=False)
+        return unpack(new_x), score
+
+
+    # Function to implement a given move using the row lookup tables
+    # Returns the same list of tile moves as Board2048.move
+    def move(self, move):
+        new_x, score, tile_moves = self._slide(move)
+
+        # An invalid move leaves the board (and the state saved for undo) untouched
+        if not tile_moves:
+            return tile_moves
+
+        self.prev_packed = self.packed
+        self.prev_score = self.score
+        self.packed = new_x
+        self.score += score
+
+        return tile_moves
+
+
+    # Function to slide all the rows for a move (without changing the board)
+    # Returns the new packed board, the score and the tile moves (if with_moves)
+    def _slide(self, move, with_moves:bool=True) -> tuple:
+        try:
+            transposed, reverse = DIRECTIONS[move]
+        except KeyError:
+            raise ValueError("Invalid move!")
+
+        x = transpose(self.packed) if transposed else self.packed
+        line_cells = LINE_CELLS[move]
+
+        new_x = 0
+        score = 0
+        tile_moves = []
+
+        for l in range(SIZE):
+            row = (x >> (16*l)) & ROW_MASK
+            line = ROW_REVERSE[row] if reverse else row
+
+            moves = ROW_MOVES[line]
+            if moves:
+                score += ROW_SCORE[line]
+                if with_moves:
+                    cells = line_cells[l]
+                    tile_moves.extend([(cells[src], cells[dst], merge) for src, dst, merge in moves])
+
+            new_row = ROW_LEFT[line]
+            new_x |= (ROW_REVERSE[new_row] if reverse else new_row) << (16*l)
+
+        return (transpose(new_x) if transposed else new_x), score, tile_moves
+
+
+    # Function to check if the game is over (no valid moves left)
+    def gameover(self) -> bool:
+        x = self.packed
+
+        # Check for an empty square (a nibble with no bits set)
+        y = x | (x >> 1)
+        y |= y >> 2
+        if y & NIBBLE_ONES != NIBBLE_ONES:
+            return False
+
+        # On a full board, a row or column changes on sliding only if two adjacent tiles can merge
+        t = transpose(x)
+        for l in range(SIZE):
+            row = (x >> (16*l)) & ROW_MASK
+            col = (t >> (16*l)) & ROW_MASK
+            if ROW_LEFT[row] != row or ROW_LEFT[col] != col:
+                return False
+
+        return True
+
+
+    def undo(self):
+        self.packed = self.prev_packed
+        self.score = self.prev_score
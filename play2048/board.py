@@ -1,49 +1,159 @@
 import numpy as np
-import random
-from random import Random
+
+from .rng import SpawnRNG, PROB_TWO
+from .slidecache import DEFAULT_CACHE
 
 # Description: This file contains the Board2048 class which is used to represent the 2048 board.
 
 DEFAULT_SIZE = 4
 
-POS_SEED = random.randint(0, 2**32-1)
-TILE_SEED = 20
+# The exponents are stored as signed bytes (to allow for the wildcard tile -1)
+DTYPE = np.int8
+
+# Boards of at least this size slide their lines with the compiled kernel of kernels.py (if numba is installed)
+KERNEL_MIN_SIZE = 10
+
+# Line data shared by all the boards of the same size (see _line_data)
+_LINES = {}
+
+
+# Function to get the compiled slide kernel of kernels.py (None if numba is not installed)
+# (imported on first use, since play2048.kernels is also run as a script)
+def _compiled_kernel():
+    from . import kernels
+    return kernels.slide_lines if kernels.ACCELERATED else None
 
-PROB_TWO = 0.9
 
 class Board2048:
-    def __init__(self, size=DEFAULT_SIZE):
+    # Boards are slotted, since search players may hold millions of them
+    __slots__ = ('size', 'board', 'prev_board', 'score', 'prev_score', 'rng', 'cache', 'free', 'num_pairs', '_lines',
+                 '_shared_rng')
+
+    # The seed can be an integer or a numpy SeedSequence (None draws a fresh seed from the OS)
+    # The slide cache (a SlideCache) defaults to the one shared by all boards
+    def __init__(self, size=DEFAULT_SIZE, seed=None, cache=None):
         self.size = size
-        self.board = np.zeros((self.size,self.size),dtype=int)
+        self.board = np.zeros((self.size,self.size),dtype=DTYPE)
         self.prev_board = np.copy(self.board)
 
-        self.pos_rng = Random(POS_SEED)
-        self.tile_rng = Random(TILE_SEED)
+        # Score (the sum of the values of all the merged tiles) after the current and the previous move
+        self.score = 0
+        self.prev_score = 0
+
+        self.rng = SpawnRNG(seed)
+        self._shared_rng = False
+        self.cache = DEFAULT_CACHE if cache is None else cache
+        self._lines = self._line_data()
+
+        # Tracking data, kept up to date by move and add_tile:
+        #  - free: flat indices (i*size + j) of the empty squares, in increasing order
+        #  - num_pairs: number of pairs of adjacent nonempty squares with equal tiles
+        self.free = list(range(self.size * self.size))
+        self.num_pairs = 0
+
+
+    # Function to compute (once per board size) for every move ID:
+    #  - the flat indices of the squares of each line, in the scan order, as a (size, size) array
+    #  - the same squares as a nested list of (i,j) tuples (for the list of tile moves)
+    #  - a preallocated buffer for reading the lines
+    def _line_data(self) -> dict:
+        lines = _LINES.get(self.size)
+        if lines is None:
+            lines = {}
+            for move_id in (1, 2, 3, 4):
+                pos_list, vdir = self.parse_move(move_id)
+                cells = [[tuple(int(x) for x in start_pos + k*vdir) for k in range(self.size)]
+                         for start_pos in pos_list]
+                flat = np.array([[i*self.size + j for i, j in line] for line in cells])
+                lines[move_id] = (flat, cells, np.zeros((self.size, self.size), dtype=DTYPE))
+            _LINES[self.size] = lines
+        return lines
+
+
+    # Function to make a copy of the board. The copy shares the slide cache (and the line data) with the
+    # original, which makes it cheap enough to use for search. It also shares the random number streams
+    # until its first new tile, when it clones them (see add_tile), so that new tiles on the copy do not
+    # change the new tiles of the original.
+    # Without copy_prev, the previous board of the copy is the board itself (nothing to undo).
+    def copy(self, copy_prev:bool=True):
+        board = type(self).__new__(type(self))
+        board.size = self.size
+        board.board = self.board.copy()
+        board.prev_board = self.prev_board.copy() if copy_prev else self.board.copy()
+        board.score = self.score
+        board.prev_score = self.prev_score if copy_prev else self.score
+        board.rng = self.rng
+        board._shared_rng = True
+        board.cache = self.cache
+        board._lines = self._lines
+        board.free = self.free.copy()
+        board.num_pairs = self.num_pairs
+        return board
+
+
+    # Function to return a copy of the board with a given move applied (or None if the move is invalid)
+    def apply_move_copy(self, move):
+        if not self.can_move(move):
+            return None
+        board = self.copy(copy_prev=False)
+        board.move(move)
+        return board
 
 
     def __str__(self):
         return '\n'.join([' '.join([str(cell) for cell in row]) for row in self.board])
     
     
+    # Function to replace the contents of the board (e.g. to set up a position), and optionally the score
+    # Code that writes to self.board directly must call this to keep the tracking data consistent
+    def load(self, board, score:int=None) -> None:
+        self.board[:,:] = board
+        if score is not None:
+            self.score = score
+        self._track()
+
+
+    # Function to recompute the tracking data from scratch (with a single vectorized pass)
+    def _track(self) -> None:
+        b = self.board
+        self.free = np.flatnonzero(b == 0).tolist()
+        self.num_pairs = (np.count_nonzero((b[:,1:] == b[:,:-1]) & (b[:,1:] != 0))
+                          + np.count_nonzero((b[1:,:] == b[:-1,:]) & (b[1:,:] != 0)))
+
+
     # Function to add a new tile at a random empty square 
     def add_tile(self):
-        free_tiles = self.list_free_tiles()
+        if self._shared_rng:
+            self.rng = self.rng.clone()
+            self._shared_rng = False
+        ind, tile = self.rng.draw(len(self.free))
+        pos = divmod(self.free.pop(ind), self.size)
+        self._put(pos, tile)
+        return pos, tile
+
+
+    # Function to put a given tile at the empty square pos = (i,j) (e.g. to replay a recorded game)
+    def place_tile(self, pos:tuple, tile:int) -> None:
+        if self.board[pos] != 0:
+            raise ValueError(f"Square {pos} is not empty!")
+        self.free.remove(pos[0]*self.size + pos[1])
+        self._put(pos, tile)
+
 
-        # Random.choices returns a list of length 1 by default
-        pos = self.pos_rng.choices(free_tiles)[0]
-        tile = self.tile_rng.choices([1,2], cum_weights=[PROB_TWO,1.0])[0]
-        
+    # Function to write a new tile into an empty square (already removed from the list of free squares)
+    # Only the neighbours of the new tile need to be checked to update the tracking data
+    def _put(self, pos:tuple, tile:int) -> None:
         self.board[pos] = tile
 
-        return pos, tile
+        i, j = pos
+        for ni, nj in ((i-1, j), (i+1, j), (i, j-1), (i, j+1)):
+            if 0 <= ni < self.size and 0 <= nj < self.size and self.board[ni,nj] == tile:
+                self.num_pairs += 1
 
 
     # Function to compute the list of free tiles on the board
     def list_free_tiles(self):
-        return [ (i,j) 
-            for i in range(self.size) 
-            for j in range(self.size) 
-            if self.board[i,j] == 0 ]
+        return [divmod(k, self.size) for k in self.free]
     
 
     # Takes a move ID and returns: 
@@ -68,62 +178,99 @@ class Board2048:
         return startpos, vdir
 
 
+    # Function to check if a move is valid without performing it: some tile has an empty square or an
+    # equal tile next to it in the direction of the move
+    def can_move(self, move) -> bool:
+        b = self.board
+        match move:
+            case 1:
+                ahead, tiles = b[:-1,:], b[1:,:]
+            case 2:
+                ahead, tiles = b[:,:-1], b[:,1:]
+            case 3:
+                ahead, tiles = b[1:,:], b[:-1,:]
+            case 4:
+                ahead, tiles = b[:,1:], b[:,:-1]
+            case _:
+                raise ValueError("Invalid move!")
+        return bool(((tiles != 0) & ((ahead == 0) | (ahead == tiles))).any())
+
+
+    # Function to list the valid moves (in the order of the move IDs)
+    def legal_moves(self) -> list[int]:
+        return [move_id for move_id in (1, 2, 3, 4) if self.can_move(move_id)]
+
+
+    # Function to compute the result of a move without changing the board
+    # Returns the new board array and the score of the move, or None if the move is invalid
+    def peek_move(self, move):
+        if not self.can_move(move):
+            return None
+        flat, new_lines, _, score = self._slide(move, with_moves=False)
+        board = self.board.copy()
+        board.put(flat, new_lines)
+        return board, score
+
+
     # Function to implement a given move in self.board (saving the previous state in self.prev_board).  
     # Returns a list of moves (to be used by the graphics engine for animation)
+    # The score of the move (the sum of the values of the merged tiles) is added to self.score
     def move(self, move):
-        pos_list, vdir = self.parse_move(move)
-        tile_moves = []
+        flat, new_lines, tile_moves, score = self._slide(move)
 
-        self.prev_board[:,:] = self.board[:,:]
-        self.board[:,:] *= 0 
-        new_pos = np.array([0,0])
-                
-        for start_pos in pos_list:         
-            new_pos[:] = start_pos[:]
-            prev_val = 0 
-            
-            for i in range(self.size):
-                pos = start_pos + i * vdir
-                val = self.prev_board[tuple(pos)]
-                # Only need to do something if the square is nonempty
-                if val != 0:
-                    if prev_val != 0 and val == prev_val:
-                        # Merge tiles 
-                        self.board[tuple(new_pos - vdir)] += 1
-                        prev_val = 0
-                        tile_moves.append((tuple(pos), tuple(new_pos-vdir), True))
-                        # tile_moves.append((tuple(pos), *self._calc_shift(pos, new_pos-vdir), True))
-                    else:                 
-                        # Move tile 
-                        self.board[tuple(new_pos)] = val      
-
-                        # Only add to the list of moves if the tile has moved
-                        if (new_pos!=pos).any():
-                            tile_moves.append((tuple(pos), tuple(new_pos), False))
-
-                        prev_val = val
-                        new_pos += vdir
-        
+        # An invalid move leaves the board (and the state saved for undo) untouched
+        if not tile_moves:
+            return tile_moves
+
+        np.copyto(self.prev_board, self.board)
+        self.prev_score = self.score
+        self.score += score
+        self.board.put(flat, new_lines)
+        self._track()
 
         return tile_moves
+
+
+    # Function to slide all the lines of the board for a move (without changing the board)
+    # Returns the flat indices of the lines, the new lines, the tile moves (if with_moves) and the score
+    # All the lines are read at once and slid through the cache (or by the compiled kernel on large boards,
+    # see kernels.py)
+    def _slide(self, move, with_moves:bool=True) -> tuple:
+        if move not in self._lines:
+            raise ValueError("Invalid move!")
+        flat, cells, buffer = self._lines[move]
+        tile_moves = []
+
+        np.take(self.board, flat, out=buffer)
+
+        kernel = _compiled_kernel() if self.size >= KERNEL_MIN_SIZE else None
+        if kernel is not None:
+            new_lines, moves, score = kernel(buffer)
+            if with_moves:
+                for line, src, dst, merge in moves.tolist():
+                    tile_moves.append((cells[line][src], cells[line][dst], bool(merge)))
+        else:
+            new_lines = []
+            score = 0
+            for line_cells, line in zip(cells, buffer.tolist()):
+                new_line, moves, line_score = self.cache.slide(tuple(line))
+                new_lines.append(new_line)
+                score += line_score
+                if with_moves:
+                    for src, dst, merge in moves:
+                        tile_moves.append((line_cells[src], line_cells[dst], merge))
+
+        return flat, new_lines, tile_moves, score
     
     
     # Function to check if the game is over (no valid moves left)
+    # The game can only be over on a full board without any pair of adjacent equal tiles
     def gameover(self) -> bool:
-        for i in range(self.size):
-            for j in range(self.size):
-                if self.board[i,j] == 0:
-                    return False
-                
-            for j in range(self.size-1):                
-                if self.board[i,j] == self.board[i,j+1]:
-                    return False  
-                if self.board[j,i] == self.board[j+1,i]:
-                    return False
-
-        return True
+        return not self.free and self.num_pairs == 0
     
 
     def undo(self):
-        self.board = np.copy(self.prev_board)
+        np.copyto(self.board, self.prev_board)
+        self.score = self.prev_score
+        self._track()
     
@@ -1,5 +1,6 @@
+import asyncio
 import curses 
-from time import sleep
+from time import monotonic, sleep
 from numpy import sign
 from .colors import COLORS
 
@@ -33,13 +34,10 @@ C_WIDE_T, C_WIDE_B, C_WIDE_L, C_WIDE_R = '▀', '▄', '▌', '▐'
 C_WIDE_TL, C_WIDE_TR, C_WIDE_BL, C_WIDE_BR = '▛', '▜', '▙', '▟'
 C_FULL = '█'
 
-VSTEP = 1 
-HSTEP = 1
-
 # MOVES 
 KEY_UP, KEY_DOWN, KEY_LEFT, KEY_RIGHT = 'w', 's', 'a', 'd'
-KEY_UNDO, KEY_QUIT = 'u', 'q'
-MOVE_DICT = {KEY_UP:1, KEY_LEFT:2, KEY_DOWN:3, KEY_RIGHT:4, KEY_UNDO:0, KEY_QUIT:-1}
+KEY_UNDO, KEY_REDO, KEY_QUIT = 'u', 'r', 'q'
+MOVE_DICT = {KEY_UP:1, KEY_LEFT:2, KEY_DOWN:3, KEY_RIGHT:4, KEY_UNDO:0, KEY_QUIT:-1, KEY_REDO:-2}
 
 # COLORS 
 ORIG_BKGCOLOR = COLORS.BKGD
@@ -62,19 +60,30 @@ TITLE_STR = "🯉  🯲 🯰 🯴 🯸  🯉"
 INSTR_STR = " [Press w/s/a/d for movement, q for exit]"
 COPYRIGHT_STR = "© 2025 Vatsal Dwivedi. All rights reserved."
 
-DELAYS = {'v':0.03, 'h':0.01, 'm':0.1}
+# ANIMATION TIMES (IN SECONDS)
+ANIM_DURATION = 0.12     # Duration of the movement of the tiles
+FRAME_TIME = 1/60        # Target time between two frames
+MERGE_DELAY = 0.1        # Time for which the merged tiles are highlighted
+INPUT_POLL = 0.005       # Time between two reads of the keyboard in the asyncio game loop
 
 class CLI:
 
     # CONSTRUCTOR AND DESTRUCTOR
     # =================================================================
 
-    def __init__(self, size):
+    def __init__(self, size, human:bool=True):
 
         """
             The game takes place inside a window, which is always centered in the terminal.
+            The flag human is False if the moves are made by an AI player, i.e. no one reads the keyboard.
         """
         self.size = size
+        self.human = human
+
+        # What is currently drawn at each tile index, as (txt, attr, border), where border is 'grid' for
+        # the usual gridlines, 'wide' for a thick border and None if the gridlines were not redrawn.
+        # Tiles that are missing (e.g. those partially covered by a shifted tile) must be redrawn in full.
+        self.shown = {}
 
         # Initialize curses screen
         self.scr = self._init_scr()
@@ -84,6 +93,7 @@ class CLI:
         self._comp_lengths()
 
         self._init_fonts()            
+        self._init_sprites()
         
         # Create the subwindows sub.window and sub.game 
         try:
@@ -97,7 +107,7 @@ class CLI:
         
         self._draw_banner()
         self._draw_grid()
-        self.window.refresh()
+        self._flush()
     
 
 
@@ -264,6 +274,23 @@ class CLI:
 
 
 
+    # Function to send all the pending changes to the terminal in a single update
+    def _flush(self) -> None:
+        self.window.noutrefresh()
+        self.board.noutrefresh()
+        self._update_screen()
+
+
+    def _update_screen(self) -> None:
+        curses.doupdate()
+
+
+    # Function to force a full redraw of the board at the next call of draw_board
+    def invalidate(self) -> None:
+        self.shown.clear()
+
+
+
     # TILE ROUNTINES
     # =================================================================
 
@@ -352,18 +379,81 @@ class CLI:
         self.board.addstr(row + TILE_VOFFSET + 1, col + TILE_HOFFSET, format(txt, format_str), attr)
 
     
+    # Function to precompute the positions and the corner characters of all the tiles and to prerender
+    # the sprites of all the symbols in all the tile styles (must be called after _init_fonts)
+    def _init_sprites(self) -> None:
+        inds = [(i,j) for i in range(self.size) for j in range(self.size)]
+        self.tile_pos = {ind: self._pos_from_ind(ind) for ind in inds}
+        self.tile_corners = {ind: self._comp_corners(ind) for ind in inds}
+
+        # Sprites are keyed by (txt, attr, border), where border is None (text only), 'wide' (thick border,
+        # also used for the shifted tiles, which only differ in the position) or a tuple of corners
+        self.sprites = {}
+        styles = {self.tile_attr, self.new_tile_attr, self.mov_tile_attr, self.merged_tile_attr, self.wild_tile_attr}
+        borders = [None, 'wide'] + list(set(self.tile_corners.values()))
+        for txt in SYMBOLS.values():
+            for attr in styles:
+                for border in borders:
+                    self.sprites[txt, attr, border] = self._build_sprite(txt, attr, border)
+
+
+    # Function to render a tile into a tuple of (row offset, column offset, string, attr) entries, which
+    # reproduce the output of _draw_tile_border or _draw_wide_tile_border followed by _add_tile_text
+    def _build_sprite(self, txt:str, attr:int, border) -> tuple:
+        text_rows = [" "*TXT_WIDTH] * TILE_NROWS
+        text_rows[TILE_VOFFSET] = format(txt, f'^{TXT_WIDTH}')
+
+        match border:
+            case None:
+                return tuple((i + 1, TILE_HOFFSET, s, attr) for i, s in enumerate(text_rows))
+            case 'wide':
+                border_attr = attr
+                rows = ([C_FULL*(TILE_NCOLS + 2)] + [C_FULL*2 + ' '*(TILE_NCOLS-2) + C_FULL*2]*TILE_NROWS
+                        + [C_FULL*(TILE_NCOLS + 2)])
+            case (tl, tr, bl, br):
+                border_attr = self.grid_attr
+                rows = ([tl + C_HORZ*TILE_NCOLS + tr] + [C_VERT + ' '*TILE_NCOLS + C_VERT]*TILE_NROWS
+                        + [bl + C_HORZ*TILE_NCOLS + br])
+            case _:
+                raise ValueError("Invalid tile border!")
+
+        # With a single attribute, the text is written into the rows of the border
+        if border_attr == attr:
+            for i, s in enumerate(text_rows):
+                rows[i+1] = rows[i+1][:TILE_HOFFSET] + s + rows[i+1][TILE_HOFFSET + len(s):]
+            return tuple((i, 0, s, attr) for i, s in enumerate(rows))
+
+        return (tuple((i, 0, s, border_attr) for i, s in enumerate(rows))
+                + tuple((i + 1, TILE_HOFFSET, s, attr) for i, s in enumerate(text_rows)))
+
+
+    # Function to draw a tile with text txt and top-left corner at (row, col) from the sprite cache
+    def _draw_sprite(self, row:int, col:int, txt:str, attr:int, border) -> None:
+        sprite = self.sprites.get((txt, attr, border))
+        if sprite is None:
+            sprite = self.sprites[txt, attr, border] = self._build_sprite(txt, attr, border)
+
+        addstr = self.board.addstr
+        for drow, dcol, s, a in sprite:
+            addstr(row + drow, col + dcol, s, a)
+
+
     # Function to draw the tile at index ind = (i,j) on the board with text txt 
     # The flag draw_border indicates whether to redraw the gridlines around the tile
     def _draw_tile(self, ind:tuple, txt:str, attr:int, draw_border:bool=False, wide_border:bool=False) -> None:
-        pos = self._pos_from_ind(ind)
+        row, col = self.tile_pos[ind]
 
         if draw_border:
-            if wide_border:
-                self._draw_wide_tile_border(pos, attr)
-            else:
-                self._draw_tile_border(pos, self.grid_attr, corners=self._comp_corners(ind))
-        
-        self._add_tile_text(pos, txt, attr)
+            border = 'wide' if wide_border else self.tile_corners[ind]
+        else:
+            border = None
+        self._draw_sprite(row, col, txt, attr, border)
+
+        if draw_border:
+            self.shown[ind] = (txt, attr, 'wide' if wide_border else 'grid')
+        else:
+            prev = self.shown.get(ind)
+            self.shown[ind] = (txt, attr, prev[2] if prev else None)
 
 
     # Function to draw a tile that has been shifted in a horizontal or vertical direction
@@ -372,11 +462,11 @@ class CLI:
     # It is assumed that the shift is less than the size of the tile
     # The tile also supports a reset mode, whereby previously modified borders are reset to the original state
     def _draw_shifted_tile(self, ind:tuple, txt:str, attr:int, shift_dir:chr, shift_val:int, reset:bool=False) -> None:
-        row, col = self._pos_from_ind(ind)        
+        row, col = self.tile_pos[ind]
         
         if shift_val == 0: 
-            self._draw_wide_tile_border((row, col), attr)
-            self._add_tile_text((row, col), txt, attr)
+            self._draw_sprite(row, col, txt, attr, 'wide')
+            self.shown[ind] = (txt, attr, 'wide')
             return
         
         if shift_dir == 'v' and abs(shift_val) >= TILE_NROWS + BORDER_WIDTH: 
@@ -396,147 +486,119 @@ class CLI:
         
         # self._draw_tile_border((row, col), self.grid_attr, corners=(tl, tr, bl, br))
         
-        self._draw_wide_tile_border((row, col), attr)
-        self._add_tile_text((row, col), txt, attr)
+        if row < 0 or row > self.board_height - TILE_NROWS - 2\
+              or col < 0 or col > self.board_width - TILE_NCOLS - 2:
+            raise ValueError(f"Cannot draw a tile with top-left corner at {row, col}!")
+
+        self._draw_sprite(row, col, txt, attr, 'wide')
+
+        # The shifted tile covers parts of the tile at ind and of its neighbour in the direction of the shift
+        r, c = ind
+        dr, dc = (int(sign(shift_val)), 0) if shift_dir == 'v' else (0, int(sign(shift_val)))
+        self.shown.pop((r, c), None)
+        self.shown.pop((r + dr, c + dc), None)
         
 
     # Function to add a new tile to the board at index ind = (i,j)
     def add_new_tile(self, tiles, ind, tile_id):
         self._clear_msg()
         self._draw_tile(ind, SYMBOLS[tile_id], self.new_tile_attr)
-        self.board.refresh()
+        self._flush()
 
     # Function to draw the board for a given matrix of tiles 
+    # Only the tiles that differ from what is currently on the screen are redrawn
     def draw_board(self, tiles):
         for i in range(self.size):
             for j in range(self.size):
-                self._draw_tile((i,j), SYMBOLS[tiles[i,j]], self.tile_attr)
-        self.board.refresh()
+                txt = SYMBOLS[tiles[i,j]]
+                shown = self.shown.get((i,j))
+                if shown == (txt, self.tile_attr, 'grid'):
+                    continue
+                # The gridlines only need to be redrawn if they were modified
+                draw_border = shown is None or shown[2] != 'grid'
+                self._draw_tile((i,j), txt, self.tile_attr, draw_border=draw_border)
+        self._flush()
 
 
     # Function to animate the moves made by the player
-    # The variable tile_moves is a list of entries of the form (staring_end, shift_dir, shift_val, merge_flag)
-    # where starting_end is the starting position of the tile, shift_dir is the direction of shift ('h' or 'v')
-    # shift_val is the magnitude of shift, and merge_flag is a boolean indicating whether the tile was merged
-    def make_move(self, tiles, moved_tiles, move_id, tile_moves:list[tuple]):    
-        
-        # HELPER FUNCTIONS
-        # =====================
-
-        # Function to compute parameters related to the movement for a given shift direction
-        def parse_move(tile_moves, shift_dir):
-            if shift_dir == 1:
-                tile_dim, step = TILE_HEIGHT,-VSTEP
-                tile_moves.sort(key = lambda mov: mov[0][0])
-            elif shift_dir == 2:
-                tile_dim, step = TILE_WIDTH, -HSTEP    
-                tile_moves.sort(key = lambda mov: mov[0][1])
-            elif shift_dir == 3:
-                tile_dim, step = TILE_HEIGHT, VSTEP
-                tile_moves.sort(key = lambda mov: mov[0][0], reverse=True)
-            elif shift_dir == 4:
-                tile_dim, step = TILE_WIDTH, HSTEP    
-                tile_moves.sort(key = lambda mov: mov[0][1], reverse=True)
-            else:
-                raise ValueError("Invalid shift direction!")
-            return tile_dim, step
-            
-
-        # Function to compute the index of a tile after a shift in a given direction
-        def compute_shifted_ind(ind:tuple, shift_dir:chr, shift_val:int) -> tuple:
-            r,c = ind
-            if shift_dir == 'v':
-                return r+shift_val, c
-            elif shift_dir == 'h':
-                return r, c+shift_val
-            else:         
-                raise ValueError("Invalid shift direction!")    
-            
-
-
-        # MAIN FUNCTION BODY
-        # =====================
-        shift_dir = 'v' if move_id in [1,3] else 'h'
-        tile_dim, step = parse_move(tile_moves, move_id)
-        move_flags = [True for move in tile_moves]
-        
-        shift = 0
-        x = 0
-        # self.scr.addstr(0, 0, str(move_flags))
-        while any(move_flags):
-            shift += step
-
-            # Compute the number of full tile and fractional shifts for a given coordinate shift
-            # Setting int_shift = shift // tile_dim etc does not work, since we want the least amount of shift
-            # required counting from zero. 
-            int_shift = (abs(shift) // tile_dim) * sign(step)
-            frac_shift = (abs(shift) % tile_dim) * sign(step)
-            
-            
-            # Draw the tiles that are still in motion
-            for i, move in enumerate(tile_moves):
-                if move_flags[i]:
-                    orig_ind, final_ind, merge = move
-                    txt = SYMBOLS[tiles[orig_ind]]
-
-                    # The index of the shifted tile 
-                    shifted_ind = compute_shifted_ind(orig_ind, shift_dir, int_shift)
-                
-                    if frac_shift: 
-                        # Redraw an unshifted empty tile at the previous position to erase the border
-                        self._draw_tile(shifted_ind, '', self.tile_attr, draw_border=True)
-
-                        # Draw the shifted tile 
-                        self._draw_shifted_tile(shifted_ind, txt, self.mov_tile_attr, shift_dir, frac_shift)                        
-                        
-                    else:
-                        # Redraw an unshifted empty tile at the previous position to erase the border
-                        # In this case we need a tile that was shifted by one less than the current shift
-                        prev_ind = compute_shifted_ind(orig_ind, shift_dir, int_shift-sign(step))
-                        self._draw_tile(prev_ind, '', self.tile_attr, draw_border=True)
-
-                        # Draw the shifted tile 
-                        self._draw_shifted_tile(shifted_ind, txt, self.mov_tile_attr, shift_dir, frac_shift)
-
-                        if shifted_ind == final_ind:
-                            move_flags[i] = False
-                        
-
-            # Redraw all the tiles that have finished moving (to avoid anomalous borders)                        
-            for i, move in enumerate(tile_moves):
-                if not move_flags[i]:
-                    orig_ind, final_ind, merge = move
-                    txt = SYMBOLS[moved_tiles[final_ind]]
-
-                    if merge:
-                        self._draw_tile(final_ind, txt, self.merged_tile_attr, draw_border=True, wide_border=True)
-                    else:
-                        self._draw_tile(final_ind, txt, self.mov_tile_attr, draw_border=True, wide_border=True)
-                                            
-
-            self.board.refresh()
-            sleep(DELAYS[shift_dir])
-            # x += 1
-            # self.scr.addstr(x, 0, str(move_flags))
-            # self.scr.refresh()
-            
-
-        for move in tile_moves:
-            if move[2]:
-                txt = SYMBOLS[moved_tiles[move[1]]]             
-                self._draw_tile(move[1], txt, self.merged_tile_attr, draw_border=True, wide_border = True)
-            
-        self.board.refresh()
-        sleep(DELAYS['m'])
+    # The variable tile_moves is a list of entries of the form (orig_ind, final_ind, merge_flag), as returned
+    # by Board2048.move. The animation takes ANIM_DURATION seconds irrespective of the distance travelled by
+    # the tiles and of the board size; frames are dropped if drawing falls behind. A key press ends the
+    # animation immediately (the key is left in the input queue for get_move if a human is playing).
+    def make_move(self, tiles, moved_tiles, move_id, tile_moves:list[tuple]):
+        steps = self._animation(tiles, moved_tiles, move_id, tile_moves)
+        try:
+            until = next(steps)
+            while True:
+                until = steps.send(self._wait(until))
+        except StopIteration:
+            pass
 
-        for move in tile_moves:
-            txt = SYMBOLS[moved_tiles[move[1]]]             
-            self._draw_tile(move[1], txt, self.tile_attr, draw_border=True)
 
-        self.board.refresh()
+    # Same as make_move, for the asyncio game loop. Instead of the key presses, the animation is ended by
+    # the callable fast_forward, which is checked between the frames (e.g. to skip ahead if moves are queued)
+    async def make_move_async(self, tiles, moved_tiles, move_id, tile_moves:list[tuple], fast_forward=None):
+        steps = self._animation(tiles, moved_tiles, move_id, tile_moves)
+        try:
+            until = next(steps)
+            while True:
+                skip = fast_forward is not None and fast_forward()
+                if not skip:
+                    await asyncio.sleep(max(0.0, until - monotonic()))
+                    skip = fast_forward is not None and fast_forward()
+                until = steps.send(skip)
+        except StopIteration:
+            pass
 
 
+    # Generator that draws the frames of the animation of a move. After every frame, it yields the time until
+    # which to wait before the next frame; the caller sends back True to end the animation immediately.
+    def _animation(self, tiles, moved_tiles, move_id, tile_moves:list[tuple]):
+        anim = _MoveAnimation(self, tiles, moved_tiles, move_id, tile_moves)
+
+        start = monotonic()
+        frame = 0
+        skip = False
+        while not skip:
+            progress = min(1.0, (monotonic() - start) / ANIM_DURATION)
+            anim.draw(progress)
+            self._flush()
+            if progress >= 1.0:
+                break
+
+            # Wait for the next frame that is still in the future
+            frame = max(frame + 1, int((monotonic() - start) / FRAME_TIME) + 1)
+            skip = yield start + frame * FRAME_TIME
+
+        anim.draw(1.0)
+        if anim.draw_merges():
+            self._flush()
+            if not skip:
+                yield monotonic() + MERGE_DELAY
+
+        anim.draw_final()
+        self._flush()
+
+
+    # Function to wait until the given (monotonic) time, unless a key is pressed before that
+    # Returns True if a key was pressed. The key is pushed back into the input queue for a human player,
+    # and consumed otherwise (nothing else would read it, and every later wait would end at once).
+    def _wait(self, until:float) -> bool:
+        delay = until - monotonic()
+        if delay <= 0:
+            return False
+
+        self.scr.timeout(max(1, int(1000 * delay)))
+        try:
+            key = self.scr.getch()
+        finally:
+            self.scr.timeout(-1)
 
+        if key == -1:
+            return False
+        if self.human:
+            curses.ungetch(key)
+        return True
 
 
     # TEXT PRINTING ROUNTINES
@@ -544,17 +606,17 @@ class CLI:
 
     def _display_msg(self, msg, attr):
         self.window.addstr(self.msg_row, 1, msg.center(self.win_width-2), attr)
-        self.window.refresh()
+        self._flush()
 
 
     def _clear_msg(self):
         self._display_msg("", self.msg_attr)
 
 
-    def display_score(self, score):
-        msg = f"{score} moves played so far"
+    def display_score(self, moves, score=None):
+        msg = f"{moves} moves played so far" if score is None else f"Score: {score}, {moves} moves"
         self.window.addstr(self.score_row, SIDE_MARGIN, msg.rjust(self.board_width), self.score_attr)
-        self.window.refresh()
+        self._flush()
 
 
     def quit_game(self):
@@ -573,27 +635,154 @@ class CLI:
         self._display_msg(msg, self.msg_attr)
 
 
+    def display_error(self, msg):
+        self._display_msg(msg, self.err_attr)
+
+
 
     # INPUT ROUNTINE
     # =================================================================
     def get_move(self):
         while True: 
-            inp = self.scr.getch()
-            if inp == curses.KEY_RESIZE:
-                # self._clear_msg()
-                self._display_msg("Screen resized!", self.msg_attr)
-                self.resize_scr()
-                continue
-            elif chr(inp) in MOVE_DICT:
-                # self._clear_msg()
-                return MOVE_DICT[chr(inp)]
-            else:
-                self.display_error("Invalid key! Press w/s/a/d to move, q to quit...")
-                continue
+            move_id = self._parse_key(self.scr.getch())
+            if move_id is not None:
+                return move_id
+
+
+    # Function to convert a key code into a move ID (None if the key does not correspond to a move)
+    def _parse_key(self, inp:int):
+        if inp == curses.KEY_RESIZE:
+            # self._clear_msg()
+            self._display_msg("Screen resized!", self.msg_attr)
+            self.resize_scr()
+            return None
+        elif 0 <= inp < 0x110000 and chr(inp) in MOVE_DICT:
+            # self._clear_msg()
+            return MOVE_DICT[chr(inp)]
+        else:
+            self.display_error("Invalid key! Press w/s/a/d to move, q to quit...")
+            return None
+
+
+    # Coroutine that reads the keyboard without blocking and puts the moves into the queue
+    # It runs until it is cancelled.
+    async def read_moves(self, queue:asyncio.Queue):
+        self.scr.nodelay(True)
+        try:
+            while True:
+                inp = self.scr.getch()
+                if inp == -1:
+                    await asyncio.sleep(INPUT_POLL)
+                    continue
+                move_id = self._parse_key(inp)
+                if move_id is not None:
+                    queue.put_nowait(move_id)
+        finally:
+            self.scr.nodelay(False)
         
 
     def resize_scr(self):
         self.scr_height, self.scr_width = self.scr.getmaxyx()
 
         self.window.addstr(3, 0, f"{self.scr_height} x {self.scr_width} <---> {curses.LINES} x {curses.COLS}")
-        self.window.refresh()
+        self.invalidate()
+        self._flush()
+
+
+
+# Class to draw the frames of the animation of a move. The frames are specified by the progress of the
+# animation (from 0 to 1), which must not decrease between frames; frames may be skipped.
+# All the tiles move at the same speed, so that the tiles that travel the largest distance take the full
+# duration of the animation.
+class _MoveAnimation:
+    def __init__(self, cli:CLI, tiles, moved_tiles, move_id:int, tile_moves:list[tuple]):
+        self.cli = cli
+        self.tiles = tiles
+        self.moved_tiles = moved_tiles
+        self.tile_moves = sorted(tile_moves, key=self._sort_key(move_id))
+
+        self.shift_dir = 'v' if move_id in [1,3] else 'h'
+        self.tile_dim = TILE_HEIGHT if self.shift_dir == 'v' else TILE_WIDTH
+        self.step = -1 if move_id in [1,2] else 1
+        axis = 0 if self.shift_dir == 'v' else 1
+
+        # Distance (in characters) travelled by each tile, and the largest of them
+        self.dists = [abs(final_ind[axis] - orig_ind[axis]) * self.tile_dim for orig_ind, final_ind, _ in self.tile_moves]
+        self.max_dist = max(self.dists, default=0)
+
+        # Number of full tiles by which each tile was shifted in the last frame, and whether it has arrived
+        self.last_int = [0] * len(self.tile_moves)
+        self.done = [False] * len(self.tile_moves)
+
+
+    # The tiles are drawn starting with the one that is the furthest in the direction of the move
+    @staticmethod
+    def _sort_key(move_id:int):
+        match move_id:
+            case 1:
+                return lambda mov: mov[0][0]
+            case 2:
+                return lambda mov: mov[0][1]
+            case 3:
+                return lambda mov: -mov[0][0]
+            case 4:
+                return lambda mov: -mov[0][1]
+            case _:
+                raise ValueError("Invalid shift direction!")
+
+
+    def _shifted_ind(self, ind:tuple, shift_val:int) -> tuple:
+        r, c = ind
+        return (r + shift_val, c) if self.shift_dir == 'v' else (r, c + shift_val)
+
+
+    # Function to draw the frame at the given progress
+    def draw(self, progress:float) -> None:
+        cli = self.cli
+        shift = round(progress * self.max_dist)
+
+        for i, (orig_ind, final_ind, merge) in enumerate(self.tile_moves):
+            if self.done[i]:
+                continue
+
+            tile_shift = min(shift, self.dists[i])
+            int_shift = (tile_shift // self.tile_dim) * self.step
+            frac_shift = (tile_shift % self.tile_dim) * self.step
+
+            # Redraw unshifted empty tiles over every position covered by the tile since the last frame
+            # (except the position where the tile is drawn unshifted)
+            last = int_shift if frac_shift else int_shift - self.step
+            for k in range(self.last_int[i], last + self.step, self.step):
+                cli._draw_tile(self._shifted_ind(orig_ind, k), SYMBOLS[0], cli.tile_attr, draw_border=True)
+
+            txt = SYMBOLS[self.tiles[orig_ind]]
+            cli._draw_shifted_tile(self._shifted_ind(orig_ind, int_shift), txt, cli.mov_tile_attr,
+                                   self.shift_dir, frac_shift)
+
+            self.last_int[i] = int_shift
+            self.done[i] = tile_shift == self.dists[i]
+
+        # Redraw all the tiles that have finished moving (to avoid anomalous borders)
+        for i, (orig_ind, final_ind, merge) in enumerate(self.tile_moves):
+            if self.done[i]:
+                txt = SYMBOLS[self.moved_tiles[final_ind]]
+                attr = cli.merged_tile_attr if merge else cli.mov_tile_attr
+                cli._draw_tile(final_ind, txt, attr, draw_border=True, wide_border=True)
+
+
+    # Function to highlight the merged tiles. Returns False if there are none.
+    def draw_merges(self) -> bool:
+        cli = self.cli
+        merged = [final_ind for _, final_ind, merge in self.tile_moves if merge]
+        for final_ind in merged:
+            txt = SYMBOLS[self.moved_tiles[final_ind]]
+            cli._draw_tile(final_ind, txt, cli.merged_tile_attr, draw_border=True, wide_border=True)
+        return bool(merged)
+
+
+    # Function to draw the moved tiles in their final state
+    def draw_final(self) -> None:
+        cli = self.cli
+        for _, final_ind, _ in self.tile_moves:
+            txt = SYMBOLS[self.moved_tiles[final_ind]]
+            cli._draw_tile(final_ind, txt, cli.tile_attr, draw_border=True)
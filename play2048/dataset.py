@@ -0,0 +1,198 @@
+import argparse
+import glob
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from .board import Board2048, DEFAULT_SIZE, DTYPE
+from .tournament import DEFAULT_PLAYER, load_player
+
+# Description: This file contains a self-play dataset for training board evaluators: one row per move,
+# with the board before the move (as exponents, as in Board2048.board), the move ID, the reward (the
+# sum of the values of the merged tiles) and a flag for the last move of a game.
+#
+# A dataset is a directory with a meta.json file and any number of shards. A shard is a raw file of rows
+# (a structured numpy dtype, without a header), which is written by a single process by appending to
+# it, so that many workers can fill a dataset in parallel without sending the rows between processes.
+# The reader memory-maps the shards, so that datasets larger than the memory can be read as well.
+#
+#   python -m play2048.dataset data/ --games 10000 --workers 8
+
+META_FILE = "meta.json"
+SHARD_PATTERN = "shard-*.bin"
+
+# Number of rows buffered by a writer before they are appended to the shard
+WRITE_BUFFER = 4096
+
+# Number of games played by a worker in a single task (each task writes its own shard)
+GAMES_PER_SHARD = 64
+
+
+# Function to build the dtype of the rows for a given board size
+def row_dtype(size:int) -> np.dtype:
+    return np.dtype([('board', DTYPE, (size, size)), ('move', np.int8),
+                     ('reward', np.float32), ('terminal', np.bool_)])
+
+
+# Function to create the directory of a dataset (or to check that an existing one has the same board size)
+def create(path:str, size:int=DEFAULT_SIZE) -> None:
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f)['size'] != size:
+                raise ValueError(f"Dataset {path} has a different board size!")
+        return
+
+    with open(meta_path, 'w') as f:
+        json.dump({'size': size, 'dtype': row_dtype(size).descr}, f)
+
+
+class ShardWriter:
+    # Appends rows to the shard file (which is created if it does not exist)
+    def __init__(self, file:str, size:int):
+        self.file = open(file, 'ab')
+        self.rows = np.zeros(WRITE_BUFFER, dtype=row_dtype(size))
+        self.num_rows = 0
+        self.total = 0
+
+
+    # A full buffer is only written out by the next row, so that the last row is always in the buffer
+    # (for end_game)
+    def append(self, board:np.ndarray, move:int, reward:float, terminal:bool=False) -> None:
+        if self.num_rows == len(self.rows):
+            self.flush()
+
+        row = self.rows[self.num_rows]
+        row['board'] = board
+        row['move'] = move
+        row['reward'] = reward
+        row['terminal'] = terminal
+        self.num_rows += 1
+
+
+    # Function to mark the last row written as the end of a game
+    def end_game(self) -> None:
+        if self.num_rows:
+            self.rows['terminal'][self.num_rows - 1] = True
+
+
+    def flush(self) -> None:
+        self.file.write(self.rows[:self.num_rows].tobytes())
+        self.file.flush()
+        self.total += self.num_rows
+        self.num_rows = 0
+
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+
+class Dataset:
+    def __init__(self, path:str):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.size = meta['size']
+        self.dtype = row_dtype(self.size)
+
+        # Shards that are still being written may end in the middle of a row, which is left out
+        self.shards = []
+        for file in sorted(glob.glob(os.path.join(path, SHARD_PATTERN))):
+            num_rows = os.path.getsize(file) // self.dtype.itemsize
+            if num_rows:
+                self.shards.append(np.memmap(file, dtype=self.dtype, mode='r', shape=(num_rows,)))
+
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+
+    # Generator of minibatches of (at most) batch_size rows, as structured arrays (e.g. batch['board'])
+    # The batches are zero-copy slices of the shards, which are visited in a random order of blocks.
+    # Consecutive rows (from the same game) stay together, so the rows of a batch are correlated;
+    # batches can be concatenated after drawing them to mix several blocks.
+    def batches(self, batch_size:int, shuffle:bool=True, seed=None):
+        blocks = [(k, start) for k, shard in enumerate(self.shards) for start in range(0, len(shard), batch_size)]
+        if shuffle:
+            np.random.default_rng(seed).shuffle(blocks)
+
+        for k, start in blocks:
+            yield self.shards[k][start:start + batch_size]
+
+
+
+# Function to play games with the given seeds and append the moves to a shard
+def _play_shard(path:str, shard:int, spec:str, seeds:list, size:int) -> int:
+    player_cls = load_player(spec)
+    writer = ShardWriter(os.path.join(path, SHARD_PATTERN.replace('*', f"{shard:06d}")), size)
+
+    for seed in seeds:
+        # Players that use the module-level random number generator are seeded as well
+        random.seed(seed)
+        player = player_cls()
+        board = Board2048(size, seed)
+        board.add_tile()
+        board.add_tile()
+
+        while not board.gameover():
+            move_id = player.next_move(board)
+            before = board.board.copy()
+            tile_moves = board.move(move_id)
+            if not tile_moves:
+                continue
+
+            after = board.board
+            reward = sum(2**int(after[final]) for _, final, merge in tile_moves if merge)
+            writer.append(before, move_id, reward)
+            board.add_tile()
+
+        writer.end_game()
+
+    writer.close()
+    return writer.total
+
+
+# Function to fill a dataset with self-play games on a pool of worker processes
+# The games have the seeds base_seed, base_seed+1, ... Returns the number of rows written
+def generate(path:str, num_games:int, spec:str=DEFAULT_PLAYER, size:int=DEFAULT_SIZE, workers:int=None,
+             base_seed:int=0) -> int:
+    load_player(spec)
+    create(path, size)
+
+    # New shards are numbered after the existing ones, so that a dataset can be extended
+    first = len(glob.glob(os.path.join(path, SHARD_PATTERN)))
+    seeds = list(range(base_seed, base_seed + num_games))
+    chunks = [seeds[i:i+GAMES_PER_SHARD] for i in range(0, num_games, GAMES_PER_SHARD)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_play_shard, path, first + k, spec, chunk, size) for k, chunk in enumerate(chunks)]
+        return sum(future.result() for future in futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m play2048.dataset",
+                                     description="Generate a self-play dataset for training board evaluators")
+    parser.add_argument("path", help="directory of the dataset")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--player", default=DEFAULT_PLAYER, help="player class as module:Class")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="size of the board")
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    rows = generate(args.path, args.games, args.player, args.size, args.workers, args.seed)
+    elapsed = perf_counter() - start
+
+    print(f"Wrote {rows} rows from {args.games} games in {elapsed:.2f}s ({rows/elapsed:.0f} rows/s)")
+    print(f"Dataset {args.path}: {len(Dataset(args.path))} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+from time import perf_counter
+
+import numpy as np
+
+from .board import Board2048, DTYPE, PROB_TWO
+from .symmetry import canonical_key
+
+# Description: This file contains the ExpectimaxPlayer class, an AI player that searches the game tree
+# by expectimax: the player picks the move with the largest expected value (max nodes), and the value of
+# a position after a move is the average over all the possible new tiles (chance nodes), weighted by
+# their probabilities. The search is iteratively deepened until the time budget for a move is used up.
+
+TIME_BUDGET = 0.2           # Time budget per move (in seconds)
+MAX_DEPTH = 8               # Maximum search depth (in moves)
+MIN_PROB = 1e-4             # Chance nodes reached with a smaller probability are not expanded
+TT_CAPACITY = 1_000_000     # Maximum number of entries in the transposition table
+
+# Weights of the heuristic evaluation of a board (adapted from the well-known expectimax solver by
+# Robert Xiao). All the terms are invariant under the symmetries of the board.
+LOST_PENALTY = 200000.0     # Per row and column, so that the values of live boards stay positive
+W_EMPTY = 270.0
+W_MERGES = 700.0
+W_MONOTONICITY = 47.0
+W_SUM = 11.0
+
+# Value of a lost position (without any valid move). The heuristic values of live positions are kept
+# positive by LOST_PENALTY on realistic boards, but can be negative on very disordered ones, so a loss is
+# valued far below any evaluation (also for other evaluators, e.g. an n-tuple network).
+LOST_VALUE = -1e12
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+# Function to compute the heuristic value of a board (the larger the better)
+def evaluate(board:np.ndarray) -> float:
+    # The wildcard tile is treated as an empty square
+    b = np.maximum(board, 0).astype(float)
+
+    empty = np.count_nonzero(board == 0)
+    merges = (np.count_nonzero((b[:, 1:] == b[:, :-1]) & (b[:, 1:] != 0))
+              + np.count_nonzero((b[1:, :] == b[:-1, :]) & (b[1:, :] != 0)))
+
+    # Rows and columns should be monotonic in either direction
+    p = b**4
+    mono = 0.0
+    for diff in (p[:, 1:] - p[:, :-1], (p[1:, :] - p[:-1, :]).T):
+        inc = np.clip(diff, 0, None).sum(axis=1)
+        dec = np.clip(-diff, 0, None).sum(axis=1)
+        mono += np.minimum(inc, dec).sum()
+
+    return (LOST_PENALTY * 2 * len(board) + W_EMPTY * empty + W_MERGES * merges
+            - W_MONOTONICITY * mono - W_SUM * (b**3.5).sum())
+
+
+class ExpectimaxPlayer:
+    # The evaluator (a function of a board array, e.g. NTupleNetwork.value) defaults to evaluate
+    def __init__(self, time_budget:float=TIME_BUDGET, max_depth:int=MAX_DEPTH, min_prob:float=MIN_PROB,
+                 tt_capacity:int=TT_CAPACITY, evaluator=None):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.min_prob = min_prob
+        self.tt_capacity = tt_capacity
+        self.evaluator = evaluate if evaluator is None else evaluator
+
+        # Transposition table, mapping (board bytes, depth) to the value of the chance node.
+        # The boards are canonicalized, so that all the symmetric positions share a single entry.
+        # It is kept between moves; when full, the oldest entries are evicted first.
+        self.tt = {}
+
+        # Scratch board used to apply the moves during the search
+        self._scratch = None
+        self._deadline = 0.0
+
+        # Counters (for the last move and for the lifetime of the player)
+        self.nodes = 0
+        self.tt_lookups = 0
+        self.tt_hits = 0
+        self.depth = 0
+        self.search_time = 0.0
+        self.total_nodes = 0
+        self.total_time = 0.0
+
+
+    # Search statistics for tuning
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.search_time if self.search_time else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.tt_hits / self.tt_lookups if self.tt_lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'nodes_per_sec': self.nodes_per_sec,
+            'tt_size': len(self.tt),
+            'tt_hit_rate': self.hit_rate,
+            'total_nodes': self.total_nodes,
+            'total_time': self.total_time,
+        }
+
+
+    def next_move(self, board:Board2048) -> int:
+        start = perf_counter()
+        self._deadline = start + self.time_budget
+        self.nodes = self.tt_lookups = self.tt_hits = self.depth = 0
+
+        if self._scratch is None or self._scratch.size != board.size:
+            self._scratch = Board2048(board.size)
+
+        root = np.array(board.board, dtype=DTYPE)
+        children = self._children(root)
+
+        # Fall back to a legal move (if any) in case not even the first iteration finishes in time
+        best_move = children[0][0] if children else 1
+
+        # Iterative deepening: only the result of a fully completed iteration is used
+        try:
+            for depth in range(1, self.max_depth + 1):
+                values = [(self._chance_node(child, depth, 1.0), move_id) for move_id, child in children]
+                if values:
+                    best_move = max(values)[1]
+                self.depth = depth
+        except _SearchTimeout:
+            pass
+
+        self.search_time = perf_counter() - start
+        self.total_nodes += self.nodes
+        self.total_time += self.search_time
+        return best_move
+
+
+    # Function to compute the boards after the valid moves of a board array, as a list of (move_id, board)
+    # The moves are peeked, so that the scratch board is loaded once for all of them
+    def _children(self, board:np.ndarray) -> list[tuple]:
+        scratch = self._scratch
+        scratch.load(board)
+        children = []
+        for move_id in (1, 2, 3, 4):
+            result = scratch.peek_move(move_id)
+            if result is not None:
+                children.append((move_id, result[0]))
+        return children
+
+
+    # Value of a position after a move, averaged over the new tiles
+    def _chance_node(self, board:np.ndarray, depth:int, prob:float) -> float:
+        if depth == 0 or prob < self.min_prob:
+            return self.evaluator(board)
+
+        key = (canonical_key(board), depth)
+        self.tt_lookups += 1
+        value = self.tt.get(key)
+        if value is not None:
+            self.tt_hits += 1
+            return value
+
+        self._scratch.load(board)
+        free_tiles = self._scratch.list_free_tiles()
+        if not free_tiles:
+            return self.evaluator(board)
+
+        value = 0.0
+        child = np.array(board)
+        for tile, tile_prob in ((1, PROB_TWO), (2, 1.0 - PROB_TWO)):
+            p = tile_prob / len(free_tiles)
+            for pos in free_tiles:
+                child[pos] = tile
+                value += p * self._max_node(child, depth - 1, prob * p)
+                child[pos] = 0
+
+        if len(self.tt) >= self.tt_capacity:
+            del self.tt[next(iter(self.tt))]
+        self.tt[key] = value
+        return value
+
+
+    # Value of a position before a move (the best of the moves)
+    def _max_node(self, board:np.ndarray, depth:int, prob:float) -> float:
+        self.nodes += 1
+        if perf_counter() > self._deadline:
+            raise _SearchTimeout
+
+        children = self._children(board)
+        if not children:
+            return LOST_VALUE
+
+        best = -float('inf')
+        for _, child in children:
+            best = max(best, self._chance_node(child, depth, prob))
+        return best
@@ -1,83 +1,324 @@
+import asyncio
+from dataclasses import dataclass
+from time import perf_counter
+
+import numpy as np
+
 from .board import Board2048, DEFAULT_SIZE
+from .bitboard import BitBoard2048
 from .cli import CLI
 from .gui import GUI 
+from .headless import Headless
+from .history import DEFAULT_DEPTH, History
 from .player import AIPlayer
 
 # The move is encoded in an integer, which takes values 
 # - 1,2,3,4 for up, left, down, right
 # - 0 for undo
 # - -1 to quit
+# - -2 for redo
 # 1: up, 2: left, 3: down, 4: right
 
 
+# Summary of a finished game, as returned by Game.run()
+@dataclass
+class GameResult:
+    moves: int              # Number of moves played
+    max_tile: int           # Value of the largest tile on the final board
+    score: int              # Sum of the values of all the merged tiles (as in the original 2048)
+    board: np.ndarray       # Final board (as exponents)
+    think_time: float = 0.0     # Total time spent by the player on choosing the moves (in seconds)
+    engine_time: float = 0.0    # Total time spent on the moves and the new tiles by the board
+    render_time: float = 0.0    # Total time spent on drawing
+
+
+# Data of a single move, as passed to the on_move hook of the observers
+@dataclass
+class MoveStats:
+    move_id: int
+    num_moves: int          # Number of moves played (including this one)
+    gain: int               # Score of the move (the sum of the values of the merged tiles)
+    score: int              # Score after the move
+    merges: int             # Number of merges in the move
+    think_time: float       # Time taken by the player to choose the move (in seconds)
+    engine_time: float      # Time taken by the board to make the move, add a new tile and check for game over
+    render_time: float      # Time taken by the graphics engine to draw the move and the new tile
+
+# Names of the hooks that observers can implement (all of them are optional):
+#  - on_move(game, stats:MoveStats) after every move (including the new tile)
+#  - on_spawn(game, pos, tile) after every new tile (also the first two)
+#  - on_gameover(game, result:GameResult) when the game has ended (also if the player quits)
+HOOKS = ('on_move', 'on_spawn', 'on_gameover')
+
+
 class Game:
-    def __init__(self, graphics:bool=False, size:int=DEFAULT_SIZE, ai:bool=False):
+    def __init__(self, graphics:bool=False, size:int=DEFAULT_SIZE, ai:bool=False, bitboard:bool=False,
+                 headless:bool=False, player=None, seed=None, replay=None, undo_depth:int=DEFAULT_DEPTH,
+                 observers=()):
         if size < 2:
             raise ValueError("Board size must be at least 2")
         
-        self.board = Board2048(size)
+        # A player object (anything with a next_move(board) method) replaces the default AIPlayer
+        if player is not None:
+            ai = True
+        if headless and not ai:
+            raise ValueError("Headless mode requires an AI player")
+        
+        # The packed bitboard engine is only available for the standard 4x4 board
+        if bitboard:
+            self.board = BitBoard2048(size, seed)
+        else:
+            self.board = Board2048(size, seed)
         self.num_moves = 0
-        self.undo_flag = False  # Flag to check if undo is possible
+        self.score = 0
+
+        # Total times spent by the player, the board and the graphics engine (in seconds)
+        self.think_time = 0.0
+        self.engine_time = 0.0
+        self.render_time = 0.0
+
+        # The hooks of the observers, by name (see HOOKS)
+        self.hooks = {name: [] for name in HOOKS}
+        for observer in observers:
+            self.add_observer(observer)
+
+        # Boards (and scores) after the last undo_depth moves, for undo and redo
+        self.history = History(size, undo_depth)
+
+        # The game is recorded to the replay file (a path or a binary file object), if one is given
+        # (imported here, since play2048.replay is also run as a script)
+        self.replay = None
+        if replay is not None:
+            from .replay import ReplayWriter
+            self.replay = ReplayWriter(replay, size, self.board.rng.seed_seq)
         
-        if ai:
+        if player is not None:
+            self.player = player
+        elif ai:
             self.player = AIPlayer()
         else:
             self.player = None
 
-        if graphics:
+        if headless:
+            self.graphics = Headless(size)
+        elif graphics:
             # self.graphics = GUI(size)
             raise NotImplementedError("GUI not implemented yet!")
         else:
-            self.graphics = CLI(size)
+            self.graphics = CLI(size, human=self.player is None)
+
+
+    # Function to register an observer, i.e. an object with any of the methods in HOOKS
+    def add_observer(self, observer) -> None:
+        for name in HOOKS:
+            hook = getattr(observer, name, None)
+            if hook is not None:
+                self.hooks[name].append(hook)
 
 
     def play(self):
-        self.board.add_tile()
-        self.board.add_tile()
+        try:
+            # A human player is served by the asyncio game loop, so that key presses are never lost
+            if self.player is None and isinstance(self.graphics, CLI):
+                asyncio.run(self.play_async())
+            else:
+                self._play_sync()
+        finally:
+            if self.replay is not None:
+                self.replay.close()
+
+        for hook in self.hooks['on_gameover']:
+            hook(self, self.result())
+
 
-        self.graphics.draw_board(self.board.board)
+    def _play_sync(self):
+        self._start(self.graphics)
 
         while True:
+            start = perf_counter()
             if self.player is None:
                 move_id = self.graphics.get_move()
             else:
                 move_id = self.player.next_move(self.board)
 
-            if move_id == -1:
-                self.graphics.quit_game()
+            if not self._turn(move_id, self.graphics, perf_counter() - start):
                 break
-            elif move_id == 0:
-                if self.undo_flag:
-                    self.undo_flag = False
-                    self.num_moves -= 1
-                    self.board.undo()
-                    self.graphics.draw_board(self.board.board)
-                    self.graphics.display_score(self.num_moves)
-                elif self.num_moves == 0:
-                    self.graphics.display_error("NO MOVES TO UNDO!")
-                else:
-                    self.graphics.display_error("CAN UNDO ONLY A SINGLE STEP!")
-                    
-                continue
-
-            tile_moves = self.board.move(move_id)  
-            # self.graphics.scr.addstr(0, 0, f"tile_moves = {tile_moves}")
-            # self.graphics.scr.addstr(7, 0, "After move\n"+str(self.board.board))
-            
-            if len(tile_moves) == 0:  # Nothing to move!
-                self.graphics.invalid_move()                
-                continue
-            else: 
-                self.graphics.make_move(self.board.prev_board, self.board.board, move_id, tile_moves)
-                self.graphics.draw_board(self.board.board)
-                self.num_moves += 1
-                self.undo_flag = True
-                self.graphics.display_score(self.num_moves)
-            
-                        
+
+
+    # Asyncio game loop, with three concurrent tasks:
+    #  - the CLI reads the keyboard without blocking and puts the moves into a queue
+    #  - this coroutine applies the moves to the board as soon as they arrive, and queues the drawing calls
+    #  - the renderer makes the drawing calls; animations are fast-forwarded while more moves are waiting
+    # The render times of the individual moves only cover the queueing of the drawing calls, while the time
+    # of the actual drawing is added to the total render time of the game.
+    async def play_async(self):
+        moves = asyncio.Queue()
+        calls = asyncio.Queue()
+        graphics = _QueuedGraphics(calls)
+
+        # An animation is fast-forwarded only if another move is waiting, either as a key press or as a
+        # queued animation (the remaining drawing calls of the same move, e.g. the new tile, do not count)
+        pending = lambda: not moves.empty() or graphics.queued_moves > 0
+
+        reader = asyncio.create_task(self.graphics.read_moves(moves))
+        renderer = asyncio.create_task(self._render(graphics, pending))
+
+        try:
+            self._start(graphics)
+            while True:
+                start = perf_counter()
+                move_id = self.player.next_move(self.board) if self.player else await moves.get()
+                if not self._turn(move_id, graphics, perf_counter() - start):
+                    break
+                await asyncio.sleep(0)
+        finally:
+            calls.put_nowait(None)
+            await renderer
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+
+    # Coroutine that makes the queued drawing calls (until it receives None)
+    async def _render(self, graphics, pending):
+        while (call := await graphics.calls.get()) is not None:
+            name, args = call
+            start = perf_counter()
+            if name == 'make_move':
+                graphics.queued_moves -= 1
+                await self.graphics.make_move_async(*args, fast_forward=pending)
+            else:
+                getattr(self.graphics, name)(*args)
+            self.render_time += perf_counter() - start
+
+
+    # Function to set up the board with the first two tiles
+    def _start(self, graphics):
+        for _ in range(2):
             pos, tile = self.board.add_tile()
-            self.graphics.add_new_tile(self.board.board, pos, tile)
+            if self.replay is not None:
+                self.replay.spawn(pos, tile)
+            for hook in self.hooks['on_spawn']:
+                hook(self, pos, tile)
+        self.history.push(self.board.board, self.score)
 
-            if self.board.gameover():
-                self.graphics.gameover()
-                break
+        graphics.draw_board(self.board.board)
+
+
+    # Function to play a single move (or undo/quit). Returns False once the game has ended.
+    # The time taken by the player to choose the move is passed on to the observers.
+    def _turn(self, move_id:int, graphics, think_time:float=0.0) -> bool:
+        if move_id == -1:
+            graphics.quit_game()
+            return False
+        elif move_id == 0 or move_id == -2:
+            self._step_history(move_id, graphics)
+            return True
+
+        self.think_time += think_time
+        start = perf_counter()
+        if not self.board.can_move(move_id):  # Nothing to move!
+            self.engine_time += perf_counter() - start
+            graphics.invalid_move()                
+            return True
+
+        tile_moves = self.board.move(move_id)  
+        engine_time = perf_counter() - start
+
+        start = perf_counter()
+        graphics.make_move(self.board.prev_board, self.board.board, move_id, tile_moves)
+        graphics.draw_board(self.board.board)
+        self.num_moves += 1
+        self.score = self.board.score
+        graphics.display_score(self.num_moves, self.score)
+        render_time = perf_counter() - start
+                    
+        start = perf_counter()
+        pos, tile = self.board.add_tile()
+        engine_time += perf_counter() - start
+
+        if self.replay is not None:
+            self.replay.move(move_id, pos, tile)
+        self.history.push(self.board.board, self.score)
+        for hook in self.hooks['on_spawn']:
+            hook(self, pos, tile)
+
+        start = perf_counter()
+        graphics.add_new_tile(self.board.board, pos, tile)
+        render_time += perf_counter() - start
+
+        start = perf_counter()
+        gameover = self.board.gameover()
+        engine_time += perf_counter() - start
+
+        self.engine_time += engine_time
+        self.render_time += render_time
+        if self.hooks['on_move']:
+            stats = MoveStats(move_id, self.num_moves, self.board.score - self.board.prev_score, self.score,
+                              sum(1 for move in tile_moves if move[2]), think_time, engine_time, render_time)
+            for hook in self.hooks['on_move']:
+                hook(self, stats)
+
+        if gameover:
+            graphics.gameover()
+            return False
+
+        return True
+
+
+    # Function to undo (move_id = 0) or redo (move_id = -2) a move using the history
+    def _step_history(self, move_id:int, graphics) -> None:
+        if move_id == 0:
+            score = self.history.undo()
+            if score is None:
+                if self.num_moves == 0:
+                    graphics.display_error("NO MOVES TO UNDO!")
+                else:
+                    graphics.display_error(f"CAN UNDO ONLY {self.history.depth} STEPS!")
+                return
+            self.num_moves -= 1
+        else:
+            score = self.history.redo()
+            if score is None:
+                graphics.display_error("NO MOVES TO REDO!")
+                return
+            self.num_moves += 1
+
+        self.score = score
+        self.board.load(self.history.board, score)
+        if self.replay is not None and move_id == 0:
+            self.replay.undo()
+        elif self.replay is not None:
+            self.replay.redo()
+        graphics.draw_board(self.board.board)
+        graphics.display_score(self.num_moves, self.score)
+
+
+    # Function to summarize the game (so far)
+    def result(self) -> GameResult:
+        board = np.array(self.board.board)
+        return GameResult(moves=self.num_moves, max_tile=2**int(board.max()), score=self.score, board=board,
+                          think_time=self.think_time, engine_time=self.engine_time, render_time=self.render_time)
+
+
+    # Function to play a game until it ends and return a summary of it 
+    def run(self) -> GameResult:
+        self.play()
+        return self.result()
+
+
+
+# Stand-in for the graphics engine that queues the drawing calls instead of making them
+# Boards and lists are copied, since the game moves on while the calls are waiting in the queue
+class _QueuedGraphics:
+    def __init__(self, calls:asyncio.Queue):
+        self.calls = calls
+        self.queued_moves = 0       # Number of make_move calls in the queue
+
+    def __getattr__(self, name):
+        def queue_call(*args):
+            args = tuple(np.array(arg) if isinstance(arg, np.ndarray) else
+                         list(arg) if isinstance(arg, list) else arg for arg in args)
+            if name == 'make_move':
+                self.queued_moves += 1
+            self.calls.put_nowait((name, args))
+        return queue_call
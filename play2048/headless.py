@@ -0,0 +1,49 @@
+# Description: This file contains the Headless class, a graphics backend that draws nothing.
+# It implements the same interface as CLI, so that a Game with an AI player can run without a
+# terminal (and without any animation delays), e.g. for benchmarking solvers.
+
+class Headless:
+
+    def __init__(self, size):
+        self.size = size
+
+
+    def draw_board(self, tiles):
+        pass
+
+
+    def make_move(self, tiles, moved_tiles, move_id, tile_moves):
+        pass
+
+
+    def add_new_tile(self, tiles, ind, tile_id):
+        pass
+
+
+    def display_score(self, moves, score=None):
+        pass
+
+
+    def display_msg(self, msg):
+        pass
+
+
+    def display_error(self, msg):
+        pass
+
+
+    def invalid_move(self):
+        pass
+
+
+    def quit_game(self):
+        pass
+
+
+    def gameover(self):
+        pass
+
+
+    # There is no keyboard to read from, so the only possible move is to quit
+    def get_move(self):
+        return -1
@@ -0,0 +1,101 @@
+import numpy as np
+
+from .board import DTYPE
+
+# Description: This file contains the History class, a bounded undo/redo history of boards (and scores).
+# The snapshots are stored in a preallocated ring buffer, so that the memory is fixed by the depth of the
+# history, and pushing, undoing and redoing copy a single board without allocating anything.
+#
+# The history can also be used as a stack for make/unmake in a search: push the board before a move
+# and pop it afterwards to restore the board, instead of copying the board for every move.
+
+DEFAULT_DEPTH = 100
+
+
+class History:
+    # The history keeps up to depth snapshots before the current one
+    def __init__(self, size:int, depth:int=DEFAULT_DEPTH):
+        if depth < 1:
+            raise ValueError("History depth must be at least 1")
+
+        self.size = size
+        self.depth = depth
+        self.boards = np.zeros((depth + 1, size, size), dtype=DTYPE)
+        self.scores = np.zeros(depth + 1, dtype=np.int64)
+
+        # Positions of the snapshots (slot = position % (depth+1)):
+        #  - cursor: the current snapshot
+        #  - bottom: the oldest snapshot that can be restored
+        #  - top: the newest snapshot (larger than cursor after an undo, until the next push)
+        self.clear()
+
+
+    # Number of snapshots up to the current one
+    def __len__(self) -> int:
+        return max(self.cursor - self.bottom + 1, 0)
+
+
+    @property
+    def can_undo(self) -> bool:
+        return self.cursor > self.bottom
+
+    @property
+    def can_redo(self) -> bool:
+        return self.cursor < self.top
+
+
+    # Function to drop all the snapshots
+    def clear(self) -> None:
+        self.cursor = self.top = -1
+        self.bottom = 0
+
+
+    # Function to add a snapshot after the current one. The snapshots after the current one (which
+    # could be redone) are dropped, and the oldest snapshot is overwritten once the history is full.
+    def push(self, board, score:int=0) -> None:
+        self.cursor += 1
+        self.top = self.cursor
+        if self.cursor - self.bottom > self.depth:
+            self.bottom += 1
+
+        slot = self.cursor % (self.depth + 1)
+        self.boards[slot] = board
+        self.scores[slot] = score
+
+
+    # Functions to step back or forward in the history. They copy the snapshot into the board out
+    # (if given) and return its score, or return None if there is nothing to undo/redo.
+    def undo(self, out:np.ndarray=None):
+        if not self.can_undo:
+            return None
+        self.cursor -= 1
+        return self._restore(out)
+
+    def redo(self, out:np.ndarray=None):
+        if not self.can_redo:
+            return None
+        self.cursor += 1
+        return self._restore(out)
+
+
+    # Function to restore the current snapshot and drop it (unmake after a push)
+    def pop(self, out:np.ndarray=None):
+        if len(self) == 0:
+            return None
+        score = self._restore(out)
+        self.cursor -= 1
+        self.top = self.cursor
+        return score
+
+
+    # The current snapshot (a view into the ring buffer)
+    @property
+    def board(self) -> np.ndarray:
+        return self.boards[self.cursor % (self.depth + 1)]
+
+
+    def _restore(self, out:np.ndarray):
+        slot = self.cursor % (self.depth + 1)
+        if out is not None:
+            np.copyto(out, self.boards[slot])
+        return int(self.scores[slot])
@@ -0,0 +1,166 @@
+import argparse
+
+import numpy as np
+
+from .slidecache import slide_line
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Description: This file contains kernels that slide all the lines of a board at once, for large boards
+# (on which almost every line is different, so that the slide cache does not help). The lines are given
+# as an (L, size) array of exponents in the scan order of a move (see Board2048._line_data), so that the
+# same kernel serves all four directions.
+#
+# If numba is installed, the lines are slid by a compiled loop. Otherwise a pure NumPy kernel resolves
+# the merges one position at a time, in parallel over all the lines. Both follow the rules of slide_line,
+# which is the reference implementation they are checked against:
+#
+#   python -m play2048.kernels --check
+#
+# The NumPy kernel is slower than the slide cache of Board2048 even when the cache misses (the merges
+# take a dozen array operations per position), so the boards only use a kernel when numba is installed.
+
+ACCELERATED = numba is not None
+
+
+# Function to slide an (L, size) array of lines towards index 0 of every line
+# Returns:
+#  - the new lines, as an (L, size) array
+#  - an (M, 4) array with a row (line, source, destination, merge_flag) for every tile that moved,
+#    ordered by line and source (the order of the tile moves of slide_line)
+#  - the score of the slide, i.e. the sum of the values of the merged tiles
+def slide_lines(lines:np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+    if ACCELERATED:
+        return _slide_lines_numba(np.ascontiguousarray(lines))
+    return slide_lines_numpy(lines)
+
+
+def slide_lines_numpy(lines:np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+    num_lines, size = lines.shape
+
+    # Move the tiles of each line to the front (keeping their order), and remember where they came from
+    src = np.argsort(lines == 0, axis=1, kind='stable')
+    vals = np.take_along_axis(lines, src, axis=1)
+    tiles = vals != 0
+
+    # Resolve the merges along the lines. absorbed flags the second tile of every merged pair.
+    absorbed = np.zeros((num_lines, size), dtype=bool)
+    merged = np.zeros(num_lines, dtype=bool)
+    score = 0
+    for k in range(size - 1):
+        cur, nxt = vals[:, k], vals[:, k+1]
+        merge = ~merged & tiles[:, k] & (cur == nxt) & tiles[:, k+1]
+        if merge.any():
+            cur[merge] += 1
+            absorbed[merge, k+1] = True
+            score += int(np.left_shift(1, cur[merge].astype(np.int64)).sum())
+        merged = merge
+
+    # Each tile ends up at the number of tiles before it that were not absorbed (an absorbed tile at
+    # the destination of its partner). A merged pair of wildcards keeps its square (with an exponent of 0).
+    kept = tiles & ~absorbed
+    dst = np.cumsum(kept, axis=1) - 1
+
+    out = np.zeros_like(lines)
+    rows, cols = np.nonzero(kept)
+    out[rows, dst[rows, cols]] = vals[rows, cols]
+
+    rows, cols = np.nonzero(tiles & ((dst != src) | absorbed))
+    moves = np.stack([rows, src[rows, cols], dst[rows, cols], absorbed[rows, cols]], axis=1)
+    return out, moves, score
+
+
+if ACCELERATED:
+    @numba.njit(cache=True)
+    def _slide_lines_numba(lines):
+        num_lines, size = lines.shape
+        out = np.zeros_like(lines)
+        moves = np.empty((num_lines * size, 4), dtype=np.int64)
+        num_moves = 0
+        score = 0
+
+        # Same loop as slide_line, for every line
+        for l in range(num_lines):
+            new_pos = 0
+            prev_val = 0
+            for pos in range(size):
+                val = lines[l, pos]
+                if val == 0:
+                    continue
+                if prev_val != 0 and val == prev_val:
+                    out[l, new_pos-1] += 1
+                    score += 1 << out[l, new_pos-1]
+                    prev_val = 0
+                    moves[num_moves, 0], moves[num_moves, 1] = l, pos
+                    moves[num_moves, 2], moves[num_moves, 3] = new_pos - 1, 1
+                    num_moves += 1
+                else:
+                    out[l, new_pos] = val
+                    if new_pos != pos:
+                        moves[num_moves, 0], moves[num_moves, 1] = l, pos
+                        moves[num_moves, 2], moves[num_moves, 3] = new_pos, 0
+                        num_moves += 1
+                    prev_val = val
+                    new_pos += 1
+
+        return out, moves[:num_moves], score
+
+
+# Function to slide the lines one at a time with the reference implementation (in the same format)
+def slide_lines_reference(lines:np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+    out = np.zeros_like(lines)
+    moves = []
+    score = 0
+    for l, line in enumerate(lines.tolist()):
+        new_line, line_moves, line_score = slide_line(line)
+        out[l] = new_line
+        moves.extend((l, src, dst, merge) for src, dst, merge in line_moves)
+        score += line_score
+    return out, np.array(moves, dtype=np.int64).reshape(-1, 4), score
+
+
+# Function to cross-check the kernels against the reference implementation on random lines
+# Returns the number of mismatches (which are printed)
+def check(sizes=(2, 3, 4, 5, 8, 16, 32), trials:int=200, seed:int=0) -> int:
+    rng = np.random.default_rng(seed)
+    kernels = {'numpy': slide_lines_numpy}
+    if ACCELERATED:
+        kernels['numba'] = _slide_lines_numba
+
+    failures = 0
+    for size in sizes:
+        for _ in range(trials):
+            # Few distinct values (to get many merges), some empty squares and some wildcards
+            fill = rng.random()
+            lines = rng.integers(1, 4, (size, size)).astype(np.int8)
+            lines[rng.random((size, size)) > fill] = 0
+            lines[rng.random((size, size)) < 0.05] = -1
+
+            ref_out, ref_moves, ref_score = slide_lines_reference(lines)
+            for name, kernel in kernels.items():
+                out, moves, score = kernel(lines)
+                if not (np.array_equal(out, ref_out) and np.array_equal(moves, ref_moves) and score == ref_score):
+                    failures += 1
+                    print(f"Mismatch of the {name} kernel for the lines\n{lines}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m play2048.kernels", description="Check the slide kernels")
+    parser.add_argument("--check", action="store_true", help="cross-check the kernels against slide_line")
+    parser.add_argument("--trials", type=int, default=200, help="number of random boards per size")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random boards")
+    args = parser.parse_args(argv)
+
+    print(f"Kernel: {'numba' if ACCELERATED else 'numpy'}")
+    if args.check:
+        failures = check(trials=args.trials, seed=args.seed)
+        print("All kernels agree with slide_line" if failures == 0 else f"{failures} mismatches")
+        raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import random
+from time import perf_counter
+
+import numpy as np
+
+from .batch import BatchBoard
+from .board import Board2048
+
+# Description: This file contains the MonteCarloPlayer class, an AI player that evaluates every valid
+# move by random playouts instead of a tree search. For each move, a number of random games is played
+# from the board after the move, and the move with the best mean score (the score of the move plus the
+# score of the playout) is picked.
+#
+# The playouts of all the moves are advanced together as a single BatchBoard of
+# num_playouts * (number of valid moves) boards, so that a step of all the playouts is a few NumPy
+# operations. The number and the depth of the playouts trade the strength of the player for the time
+# per move.
+
+NUM_PLAYOUTS = 100      # Number of playouts per move
+PLAYOUT_DEPTH = 20      # Number of random moves per playout (None plays until the game is over)
+
+
+class MonteCarloPlayer:
+    # The seed defaults to one drawn from the module-level random number generator, so that the playouts
+    # are repeatable in the runners that seed it (see tournament.py and dataset.py)
+    def __init__(self, num_playouts:int=NUM_PLAYOUTS, depth:int=PLAYOUT_DEPTH, seed=None):
+        if num_playouts < 1:
+            raise ValueError("Number of playouts must be at least 1")
+
+        self.num_playouts = num_playouts
+        self.depth = depth
+        self.rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
+        # Statistics of the last move
+        self.means = {}
+        self.search_time = 0.0
+
+
+    def stats(self) -> dict:
+        return {'means': self.means, 'playouts': self.num_playouts * len(self.means),
+                'search_time': self.search_time}
+
+
+    def next_move(self, board:Board2048) -> int:
+        start = perf_counter()
+
+        moves, afterstates, rewards = [], [], []
+        for move_id in (1, 2, 3, 4):
+            result = board.peek_move(move_id)
+            if result is not None:
+                moves.append(move_id)
+                afterstates.append(result[0])
+                rewards.append(result[1])
+
+        self.means = {}
+        if len(moves) <= 1:
+            self.search_time = perf_counter() - start
+            return moves[0] if moves else 1
+
+        # The playouts of the k-th move are the boards k*num_playouts to (k+1)*num_playouts-1
+        m = self.num_playouts
+        batch = BatchBoard(m * len(moves), board.size, seed=self.rng)
+        batch.boards[:] = np.repeat(np.stack(afterstates), m, axis=0)
+        batch.scores[:] = np.repeat(rewards, m)
+        batch.add_tile()
+
+        self._playout(batch)
+
+        means = batch.scores.reshape(len(moves), m).mean(axis=1)
+        self.means = dict(zip(moves, means.tolist()))
+        self.search_time = perf_counter() - start
+        return moves[int(np.argmax(means))]
+
+
+    # Function to play random valid moves on all the boards of the batch, until the depth of the playouts
+    # is reached or all the games are over
+    def _playout(self, batch:BatchBoard) -> None:
+        step = 0
+        while self.depth is None or step < self.depth:
+            legal = batch.legal_moves()
+            alive = legal.any(axis=1)
+            if not alive.any():
+                break
+
+            # A uniformly random valid move for every board (0 for the boards whose game is over)
+            weights = self.rng.random(legal.shape) * legal
+            moves = np.where(alive, weights.argmax(axis=1) + 1, 0)
+
+            batch.move(moves)
+            batch.add_tile(alive)
+            step += 1
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+from time import perf_counter
+
+import numpy as np
+
+from .board import Board2048, DEFAULT_SIZE, DTYPE
+from .symmetry import NUM_TRANSFORMS, transform
+
+# Description: This file contains an n-tuple network, a value function for boards that sums the weights
+# of a few patterns of tiles. Every tuple is a list of squares, and the exponents of its squares (capped
+# at NUM_VALUES-1) index a lookup table of weights. Each tuple is applied in all the 8 symmetric
+# placements on the board (see symmetry.py), which share its table.
+#
+# The weights are a single contiguous float32 array (one row per tuple), which is saved as a .npy file
+# and memory-mapped when the network is loaded, so that several processes can share large tables. The
+# network is trained by TD(0) on afterstates (the boards after a move, before the new tile), in games of
+# self-play in which it picks the moves itself:
+#
+#   python -m play2048.ntuple train ntuple/ --games 10000
+#   python -m play2048.ntuple bench ntuple/
+#
+# The trained network can be played with NTuplePlayer, or used as the evaluation of the expectimax search
+# with ExpectimaxPlayer(evaluator=NTupleNetwork.load(path).value). The parallel search takes the path
+# instead, ParallelExpectimaxPlayer(network=path), so that each worker memory-maps the network itself.
+
+META_FILE = "meta.json"
+WEIGHTS_FILE = "weights.npy"
+
+# Number of values of a square in the lookup tables (exponents 0 to 15; the wildcard counts as empty)
+NUM_VALUES = 16
+
+# Values of the squares in the lookup tables, indexed by the bytes of the exponents (a single lookup
+# is much faster than clipping the exponents)
+SQUARE_VALUES = np.clip(np.arange(256, dtype=np.uint8).view(DTYPE), 0, NUM_VALUES - 1)
+SQUARE_VALUES_64 = SQUARE_VALUES.astype(np.int64)
+
+# The 4 six-tuples that are commonly used for 2048 (Wu et al., 2014), as (row, column) squares: two that
+# span a row and a half and two 2x3 rectangles
+DEFAULT_TUPLES = (
+    ((0,0), (0,1), (0,2), (0,3), (1,0), (1,1)),
+    ((1,0), (1,1), (1,2), (1,3), (2,0), (2,1)),
+    ((0,0), (0,1), (0,2), (1,0), (1,1), (1,2)),
+    ((1,0), (1,1), (1,2), (2,0), (2,1), (2,2)),
+)
+
+# Change of the value of a board in a single TD update, per unit of TD error (shared by all its weights)
+LEARNING_RATE = 0.1
+
+# Default location of the trained network (for NTuplePlayer)
+DEFAULT_PATH = "ntuple"
+
+
+class NTupleNetwork:
+    def __init__(self, size:int=DEFAULT_SIZE, tuples=DEFAULT_TUPLES, weights:np.ndarray=None):
+        self.size = size
+        self.tuples = tuple(tuple(tuple(cell) for cell in cells) for cells in tuples)
+
+        length = len(self.tuples[0])
+        if any(len(cells) != length for cells in self.tuples):
+            raise ValueError("All the tuples must have the same length!")
+        if any(not (0 <= i < size and 0 <= j < size) for cells in self.tuples for i, j in cells):
+            raise ValueError("Tuple does not fit on the board!")
+
+        shape = (len(self.tuples), NUM_VALUES**length)
+        if weights is None:
+            weights = np.zeros(shape, dtype=np.float32)
+        elif weights.shape != shape or weights.dtype != np.float32:
+            raise ValueError(f"Weights must be a float32 array of shape {shape}!")
+        self.weights = weights
+        # A plain view, since indexing a memmap goes through the (slow) memmap subclass
+        self._flat = weights.reshape(-1).view(np.ndarray)
+
+        # Flat indices of the squares of every placement of the tuples (the symmetric placements of a tuple
+        # read the squares that the tuple covers on the transformed boards), and the offset of its table
+        grid = np.arange(size * size).reshape(size, size)
+        cells, offsets = [], []
+        for t, tuple_cells in enumerate(self.tuples):
+            for k in range(NUM_TRANSFORMS):
+                squares = transform(grid, k)
+                cells.append([squares[i, j] for i, j in tuple_cells])
+                offsets.append(t * shape[1])
+        self.cells = np.array(cells)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.powers = NUM_VALUES ** np.arange(length, dtype=np.int64)
+
+        # Contribution of the value of every square to the index of every placement, so that the indices of
+        # a single board are a single matrix product: offsets + values @ square_powers
+        self.square_powers = np.zeros((size * size, len(cells)), dtype=np.int64)
+        np.add.at(self.square_powers, (self.cells, np.arange(len(cells))[:, None]), self.powers)
+
+
+    # Number of weights that are added up for a board
+    @property
+    def num_features(self) -> int:
+        return len(self.cells)
+
+
+    # Function to compute the indices (into the flattened weights) of the features of a stack of boards
+    # of shape (N, size, size). Returns an (N, num_features) array.
+    def features(self, boards:np.ndarray) -> np.ndarray:
+        b = SQUARE_VALUES.take(boards.astype(DTYPE, copy=False).reshape(len(boards), -1).view(np.uint8))
+        return self.offsets + b[:, self.cells] @ self.powers
+
+
+    # Function to compute the value of a single board (fast path of values, for search)
+    def value(self, board:np.ndarray) -> float:
+        b = SQUARE_VALUES_64.take(board.astype(DTYPE, copy=False).ravel().view(np.uint8))
+        return sum(self._flat.take(b.dot(self.square_powers) + self.offsets).tolist())
+
+
+    # Function to compute the values of a stack of boards of shape (N, size, size)
+    def values(self, boards:np.ndarray) -> np.ndarray:
+        return self._flat[self.features(boards)].sum(axis=1, dtype=np.float64)
+
+
+    # Function to move the value of a board by learning_rate * error (spread evenly over its weights)
+    # Placements that share a weight update it once for each placement.
+    def update(self, board:np.ndarray, error:float, learning_rate:float=LEARNING_RATE) -> None:
+        np.add.at(self._flat, self.features(board[None])[0], learning_rate * error / self.num_features)
+
+
+    def save(self, path:str) -> None:
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, META_FILE), 'w') as f:
+            json.dump({'size': self.size, 'tuples': self.tuples, 'num_values': NUM_VALUES}, f)
+        np.save(os.path.join(path, WEIGHTS_FILE), self.weights)
+
+
+    # Function to load a saved network. The weights are memory-mapped (read-only) if mmap, and read into
+    # memory otherwise (e.g. to continue training).
+    @classmethod
+    def load(cls, path:str, mmap:bool=True):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta['num_values'] != NUM_VALUES:
+            raise ValueError(f"Network {path} has a different number of values per square!")
+
+        weights = np.load(os.path.join(path, WEIGHTS_FILE), mmap_mode='r' if mmap else None)
+        return cls(meta['size'], meta['tuples'], weights)
+
+
+# Function to pick the move that maximizes the reward plus the value of the afterstate
+# Returns (move_id, afterstate, reward), or None if there is no valid move
+def greedy_move(net:NTupleNetwork, board:Board2048):
+    moves, afterstates, rewards = [], [], []
+    for move_id in (1, 2, 3, 4):
+        result = board.peek_move(move_id)
+        if result is not None:
+            moves.append(move_id)
+            afterstates.append(result[0])
+            rewards.append(result[1])
+    if not moves:
+        return None
+
+    k = int(np.argmax(np.array(rewards) + net.values(np.stack(afterstates))))
+    return moves[k], afterstates[k], rewards[k]
+
+
+class NTuplePlayer:
+    # The network is loaded (memory-mapped) from path
+    def __init__(self, path:str=DEFAULT_PATH):
+        self.net = NTupleNetwork.load(path)
+
+    def next_move(self, board:Board2048) -> int:
+        choice = greedy_move(self.net, board)
+        return choice[0] if choice is not None else 1
+
+
+# Function to train a network by TD(0) on afterstates, in headless games of self-play (with the seeds
+# seed, seed+1, ...). The value of an afterstate is moved towards the reward of the next move plus the
+# value of the next afterstate, and towards 0 at the end of a game.
+# The callback (if any) is called with the number of the game and its score after every game.
+def train(net:NTupleNetwork, num_games:int, learning_rate:float=LEARNING_RATE, seed:int=0, callback=None) -> list:
+    scores = []
+    for n in range(num_games):
+        board = Board2048(net.size, seed=seed + n)
+        board.add_tile()
+        board.add_tile()
+
+        prev_after = None
+        while True:
+            choice = greedy_move(net, board)
+            if choice is None:
+                break
+            move_id, after, reward = choice
+            if prev_after is not None:
+                net.update(prev_after, reward + net.value(after) - net.value(prev_after), learning_rate)
+
+            board.move(move_id)
+            board.add_tile()
+            prev_after = after
+
+        if prev_after is not None:
+            net.update(prev_after, -net.value(prev_after), learning_rate)
+
+        scores.append(board.score)
+        if callback is not None:
+            callback(n, board.score)
+    return scores
+
+
+# Function to time the lookups of a network on random boards (in microseconds per board)
+def bench(net:NTupleNetwork, batch_size:int=1024, repeats:int=3) -> dict:
+    rng = np.random.default_rng(0)
+    boards = rng.integers(0, 12, (batch_size, net.size, net.size)).astype(np.int8)
+
+    def best_time(fn, ops):
+        times = []
+        for _ in range(repeats):
+            start = perf_counter()
+            fn()
+            times.append(perf_counter() - start)
+        return 1e6 * min(times) / ops
+
+    single = best_time(lambda: [net.value(board) for board in boards], batch_size)
+    batch = best_time(lambda: net.values(boards), batch_size)
+    return {'value_us': single, 'values_us': batch, 'batch_size': batch_size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m play2048.ntuple", description="Train an n-tuple network")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="train a network by TD(0) self-play")
+    train_parser.add_argument("path", help="directory of the network (created, or trained further)")
+    train_parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    train_parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE, help="TD learning rate")
+    train_parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    train_parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="size of the board (new networks)")
+    train_parser.add_argument("--report", type=int, default=100, help="number of games per progress report")
+
+    bench_parser = subparsers.add_parser("bench", help="time the lookups of a network")
+    bench_parser.add_argument("path", nargs="?", help="directory of the network (default: a zero network)")
+    args = parser.parse_args(argv)
+
+    match args.command:
+        case "train":
+            exists = os.path.exists(os.path.join(args.path, META_FILE))
+            net = NTupleNetwork.load(args.path, mmap=False) if exists else NTupleNetwork(args.size)
+
+            window = []
+            start = perf_counter()
+
+            def report(n, score):
+                window.append(score)
+                if len(window) == args.report or n == args.games - 1:
+                    print(f"Games {n+1-len(window)+1}-{n+1}: mean score {sum(window)/len(window):.0f}, "
+                          f"max {max(window)} ({perf_counter() - start:.0f}s)")
+                    window.clear()
+
+            try:
+                train(net, args.games, args.learning_rate, args.seed, report)
+            finally:
+                net.save(args.path)
+
+        case "bench":
+            net = NTupleNetwork.load(args.path) if args.path else NTupleNetwork()
+            result = bench(net)
+            print(f"value(): {result['value_us']:.2f} us/board, "
+                  f"values(): {result['values_us']:.2f} us/board (batches of {result['batch_size']})")
+
+
+if __name__ == "__main__":
+    main()
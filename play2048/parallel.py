@@ -0,0 +1,267 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+
+import numpy as np
+
+from .bitboard import MAX_EXPONENT, pack, unpack
+from .board import Board2048, DTYPE, PROB_TWO
+from .expectimax import MAX_DEPTH, MIN_PROB, TIME_BUDGET, TT_CAPACITY, ExpectimaxPlayer, _SearchTimeout
+from .ntuple import NTupleNetwork
+
+# Description: This file contains the ParallelExpectimaxPlayer class, which splits the expectimax search
+# of ExpectimaxPlayer at the root over a pool of worker processes. The root moves and their chance nodes
+# are expanded in the main process, and the subtrees below the new tiles (one per move, square and tile)
+# are searched by the workers, in a few chunks per worker. Each depth of the iterative deepening is one
+# round of chunks.
+#
+# The pool is created on the first move and kept for the lifetime of the player, so that the workers
+# keep their transposition tables from move to move. The boards are sent to the workers packed (see
+# pack_board). With a single worker (e.g. on a single core), the player searches serially instead.
+#
+# The evaluator is passed on to the workers. An n-tuple network is best given by the path of its directory
+# (network), so that every worker memory-maps the same weights instead of receiving a copy of them.
+#
+# The worker utilization of every move (the fraction of the time of the move that the workers spent
+# searching) is reported by stats(). It is not a speedup: the workers do not share their transposition
+# tables, so they search more nodes than a serial search would. The speedup against an actual serial
+# search can be measured with
+#
+#   python -m play2048.parallel --positions 20 --depth 3
+
+CHUNKS_PER_WORKER = 2       # Number of tasks per worker for each depth (for load balancing)
+
+# Search state of a worker process (see _init_worker)
+_SEARCHER = None
+
+
+# Functions to pack a board for the workers, as a 64-bit integer for 4x4 boards (see bitboard.py) and as
+# the raw bytes of the exponents otherwise. Both are much smaller (and faster to pickle) than an array.
+def pack_board(board:np.ndarray):
+    if board.shape == (4, 4) and 0 <= board.min() and board.max() <= MAX_EXPONENT:
+        return pack(board)
+    return board.tobytes()
+
+
+def unpack_board(data, size:int) -> np.ndarray:
+    if isinstance(data, int):
+        return unpack(data).astype(DTYPE)
+    return np.frombuffer(data, dtype=DTYPE).reshape(size, size)
+
+
+def _init_worker(min_prob:float, tt_capacity:int, evaluator=None, network:str=None) -> None:
+    global _SEARCHER
+    if network is not None:
+        evaluator = NTupleNetwork.load(network).value
+    _SEARCHER = ExpectimaxPlayer(min_prob=min_prob, tt_capacity=tt_capacity, evaluator=evaluator)
+
+
+# Worker task: search the boards (after a new tile) of a chunk to the given depth within budget seconds
+# Returns the values of the boards, the search counters and the search time, or None on a timeout
+def _search_chunk(size:int, entries:list, depth:int, budget:float):
+    searcher = _SEARCHER
+    start = perf_counter()
+    searcher._deadline = start + budget
+    searcher.nodes = searcher.tt_lookups = searcher.tt_hits = 0
+    if searcher._scratch is None or searcher._scratch.size != size:
+        searcher._scratch = Board2048(size)
+
+    try:
+        values = [searcher._max_node(unpack_board(data, size), depth, prob) for data, prob in entries]
+    except _SearchTimeout:
+        return None
+    return values, searcher.nodes, searcher.tt_lookups, searcher.tt_hits, perf_counter() - start
+
+
+class ParallelExpectimaxPlayer(ExpectimaxPlayer):
+    # workers defaults to the number of cores. The evaluation is either an evaluator function (as for
+    # ExpectimaxPlayer) or the path of a saved n-tuple network, which every worker loads memory-mapped.
+    def __init__(self, time_budget:float=TIME_BUDGET, max_depth:int=MAX_DEPTH, min_prob:float=MIN_PROB,
+                 tt_capacity:int=TT_CAPACITY, workers:int=None, evaluator=None, network:str=None):
+        if evaluator is not None and network is not None:
+            raise ValueError("Give either an evaluator or a network, not both!")
+        if network is not None:
+            evaluator = NTupleNetwork.load(network).value
+
+        super().__init__(time_budget, max_depth, min_prob, tt_capacity, evaluator)
+        self.network = network
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+        # Worker utilization of the last move (1 for a serial search)
+        self.worker_utilization = 1.0
+        self.worker_time = 0.0
+
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'workers': self.workers,
+                'worker_utilization': self.worker_utilization}
+
+
+    # Function to shut down the worker pool (it is started again by the next move)
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+    def next_move(self, board:Board2048) -> int:
+        if self.workers <= 1:
+            self.worker_utilization = 1.0
+            return super().next_move(board)
+
+        if self._pool is None:
+            evaluator = self.evaluator if self.network is None else None
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.min_prob, self.tt_capacity, evaluator, self.network))
+        try:
+            return self._parallel_move(board)
+        except (BrokenProcessPool, OSError):
+            # Carry on serially if the workers cannot be started (or have died)
+            self.close()
+            self.workers = 1
+            return super().next_move(board)
+
+
+    def _parallel_move(self, board:Board2048) -> int:
+        start = perf_counter()
+        self._deadline = start + self.time_budget
+        self.nodes = self.tt_lookups = self.tt_hits = self.depth = 0
+        self.worker_time = 0.0
+
+        if self._scratch is None or self._scratch.size != board.size:
+            self._scratch = Board2048(board.size)
+
+        root = np.array(board.board, dtype=DTYPE)
+        children = self._children(root)
+        best_move = children[0][0] if children else 1
+
+        # The subtrees below the new tiles: (root move, probability, packed board)
+        subtrees = []
+        for move_id, child in children:
+            self._scratch.load(child)
+            free_tiles = self._scratch.list_free_tiles()
+            for tile, tile_prob in ((1, PROB_TWO), (2, 1.0 - PROB_TWO)):
+                p = tile_prob / len(free_tiles)
+                for pos in free_tiles:
+                    child[pos] = tile
+                    subtrees.append((move_id, p, pack_board(child)))
+                    child[pos] = 0
+
+        num_chunks = min(self.workers * CHUNKS_PER_WORKER, len(subtrees))
+        chunks = [subtrees[i::num_chunks] for i in range(num_chunks)]
+
+        # Iterative deepening, with a round of chunks for every depth
+        for depth in range(1, self.max_depth + 1):
+            budget = self._deadline - perf_counter()
+            if budget <= 0:
+                break
+            futures = [self._pool.submit(_search_chunk, board.size, [(data, p) for _, p, data in chunk],
+                                         depth - 1, budget)
+                       for chunk in chunks]
+            results = [future.result() for future in futures]
+            if any(result is None for result in results):
+                break
+
+            values = {move_id: 0.0 for move_id, _ in children}
+            for chunk, (chunk_values, nodes, lookups, hits, elapsed) in zip(chunks, results):
+                for (move_id, p, _), value in zip(chunk, chunk_values):
+                    values[move_id] += p * value
+                self.nodes += nodes
+                self.tt_lookups += lookups
+                self.tt_hits += hits
+                self.worker_time += elapsed
+
+            if values:
+                best_move = max((value, move_id) for move_id, value in values.items())[1]
+            self.depth = depth
+
+        self.search_time = perf_counter() - start
+        self.worker_utilization = (self.worker_time / (self.workers * self.search_time)
+                                   if self.search_time else 1.0)
+        self.total_nodes += self.nodes
+        self.total_time += self.search_time
+        return best_move
+
+
+# Function to collect positions for the speedup measurement from a seeded game of random moves
+def sample_positions(num_positions:int, size:int=4, seed:int=0, spacing:int=10) -> list[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    board = Board2048(size, seed=seed)
+    board.add_tile()
+    board.add_tile()
+
+    positions = []
+    while len(positions) < num_positions:
+        if board.gameover():
+            board.load(np.zeros((size, size), dtype=DTYPE))
+            board.add_tile()
+            board.add_tile()
+        for _ in range(spacing):
+            if board.move(int(rng.integers(1, 5))):
+                board.add_tile()
+        positions.append(board.board.copy())
+    return positions
+
+
+# Function to time the serial and the parallel search to a fixed depth on every position
+# Returns a list of (serial time, parallel time, same move) for the positions
+def measure_speedup(positions:list, depth:int, workers:int=None) -> list[tuple]:
+    # The time budget is unlimited, so that both searches stop at the given depth
+    serial = ExpectimaxPlayer(time_budget=float('inf'), max_depth=depth)
+    parallel = ParallelExpectimaxPlayer(time_budget=float('inf'), max_depth=depth, workers=workers)
+
+    results = []
+    try:
+        # Start the workers before the timed moves (the transposition tables of both players are kept
+        # from position to position, so both are warmed up on the same position)
+        serial.next_move(_board(positions[0]))
+        parallel.next_move(_board(positions[0]))
+        positions = positions[1:]
+        for position in positions:
+            board = _board(position)
+            start = perf_counter()
+            serial_move = serial.next_move(board)
+            serial_time = perf_counter() - start
+
+            start = perf_counter()
+            parallel_move = parallel.next_move(board)
+            results.append((serial_time, perf_counter() - start, serial_move == parallel_move))
+    finally:
+        parallel.close()
+    return results
+
+
+def _board(position:np.ndarray) -> Board2048:
+    board = Board2048(len(position))
+    board.load(position)
+    return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m play2048.parallel",
+                                     description="Measure the speedup of the parallel expectimax search")
+    parser.add_argument("--positions", type=int, default=20, help="number of positions (the first one warms up)")
+    parser.add_argument("--depth", type=int, default=3, help="search depth")
+    parser.add_argument("--size", type=int, default=4, help="size of the board")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the positions")
+    args = parser.parse_args(argv)
+
+    positions = sample_positions(args.positions, args.size, args.seed)
+    results = measure_speedup(positions, args.depth, args.workers)
+
+    for n, (serial_time, parallel_time, same) in enumerate(results):
+        print(f"Move {n:>3}: serial {serial_time:7.3f}s, parallel {parallel_time:7.3f}s, "
+              f"speedup {serial_time/parallel_time:5.2f}{'' if same else ' (different move)'}")
+
+    serial_total = sum(result[0] for result in results)
+    parallel_total = sum(result[1] for result in results)
+    print(f"Total: serial {serial_total:.2f}s, parallel {parallel_total:.2f}s, "
+          f"speedup {serial_total/parallel_total:.2f} with {args.workers} workers")
+
+
+if __name__ == "__main__":
+    main()
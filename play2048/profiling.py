@@ -0,0 +1,110 @@
+import cProfile
+import os
+import pstats
+
+# Description: This file contains the profiling mode of python -m play2048. The game runs under cProfile,
+# the statistics are written to a file (which can be inspected with pstats or snakeviz), and the time
+# is broken down by subsystem:
+#  - board engine: the boards, the slide cache and the random number streams (including the moves that
+#    the AI tries during a search)
+#  - AI: the players
+#  - rendering: the terminal interface and the curses calls made by it
+#  - sleep/wait: sleeping, and waiting for the keyboard or for the next frame
+#
+# Functions that do not belong to any subsystem (e.g. numpy routines) are attributed to the subsystems
+# of their callers, in proportion to the time spent in them on behalf of each caller.
+
+SUBSYSTEMS = ('board engine', 'AI', 'rendering', 'sleep/wait', 'other')
+
+# Modules of the package that make up each subsystem
+ENGINE_MODULES = {'board.py', 'bitboard.py', 'batch.py', 'slidecache.py', 'kernels.py', 'rng.py', 'history.py',
+                  'symmetry.py'}
+AI_MODULES = {'player.py', 'expectimax.py', 'parallel.py', 'ntuple.py', 'montecarlo.py'}
+RENDER_MODULES = {'cli.py', 'headless.py', 'gui.py'}
+
+# Built-in functions that wait (matched against the names in the profile)
+WAIT_FUNCTIONS = ('time.sleep', "'getch'", 'select', "'poll'", "'control'")
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Function to run fn(*args) under cProfile, write the statistics to stats_file and return the result of fn
+def profile_call(stats_file:str, fn, *args):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        profiler.dump_stats(stats_file)
+
+
+# Function to find the subsystem of a profiled function (None if it has to be attributed to its callers)
+# The AI modules include the module of the player class (ai_files) for players defined elsewhere
+def _subsystem(func:tuple, ai_files:set):
+    filename, _, name = func
+    if filename == '~':
+        if any(wait in name for wait in WAIT_FUNCTIONS):
+            return 'sleep/wait'
+        if '_curses' in name:
+            return 'rendering'
+        return None
+
+    path = os.path.abspath(filename)
+    if path in ai_files:
+        return 'AI'
+    if os.path.dirname(path) == PACKAGE_DIR:
+        module = os.path.basename(path)
+        if module in ENGINE_MODULES:
+            return 'board engine'
+        if module in AI_MODULES:
+            return 'AI'
+        if module in RENDER_MODULES:
+            return 'rendering'
+    return None
+
+
+# Function to compute the time (in seconds) spent in each subsystem from the statistics of a profile
+def breakdown(stats:pstats.Stats, ai_files=()) -> dict:
+    ai_files = {os.path.abspath(file) for file in ai_files}
+    entries = stats.stats
+    shares = {}
+
+    # Fractions of the time of a function that belong to each subsystem
+    def share(func) -> dict:
+        if func in shares:
+            return shares[func]
+        shares[func] = {'other': 1.0}   # Guard against recursion
+
+        subsystem = _subsystem(func, ai_files)
+        if subsystem is not None:
+            result = {subsystem: 1.0}
+        else:
+            callers = entries[func][4]
+            total = sum(edge[2] for edge in callers.values())
+            result = {}
+            if total > 0:
+                for caller, edge in callers.items():
+                    if caller not in entries:
+                        continue
+                    for name, fraction in share(caller).items():
+                        result[name] = result.get(name, 0.0) + fraction * edge[2] / total
+            if not result:
+                result = {'other': 1.0}
+
+        shares[func] = result
+        return result
+
+    times = dict.fromkeys(SUBSYSTEMS, 0.0)
+    for func, (_, _, self_time, _, _) in entries.items():
+        for name, fraction in share(func).items():
+            times[name] += fraction * self_time
+    return times
+
+
+# Function to print the breakdown of a profile by subsystem
+def print_breakdown(stats_file:str, ai_files=()) -> None:
+    times = breakdown(pstats.Stats(stats_file), ai_files)
+    total = sum(times.values()) or 1.0
+
+    print(f"Profile written to {stats_file} (total {total:.2f}s)")
+    for name in SUBSYSTEMS:
+        print(f"  {name:<14} {times[name]:8.3f}s {100*times[name]/total:6.1f}%")
@@ -0,0 +1,251 @@
+import argparse
+import struct
+
+import numpy as np
+from numpy.random import SeedSequence
+
+from .board import Board2048
+
+# Description: This file contains the replay log of a game: a compact, append-only binary format that can
+# be written while the game is played, and the Replay class that reconstructs the board after any turn.
+#
+# A replay file is a header followed by one 16-bit record (little endian) per event:
+#
+#   header:  magic b'2048', version (1 byte), board size (1 byte),
+#            length of the seed entropy (1 byte), the entropy (little endian),
+#            length of the seed spawn key (1 byte), the spawn key (4 bytes per entry)
+#   record:  bits 15-13: code, bit 12: tile (0 for a 2, 1 for a 4), bits 11-0: flat position (i*size + j)
+#
+# The codes are 1,2,3,4 for a move (followed by the new tile, which is stored in the same record),
+# 0 for an undo, REDO for a redo and SPAWN for one of the tiles of the initial position. The seed is only kept for
+# reference, since every new tile is stored explicitly.
+#
+#   python -m play2048.replay game.rpl --move 100
+
+MAGIC = b'2048'
+VERSION = 1
+
+SPAWN = 5
+REDO = 6
+CODE_SHIFT = 13
+TILE_BIT = 1 << 12
+POS_MASK = 0xFFF
+MAX_SIZE = 64
+
+# The board after every CHECKPOINT_INTERVAL-th record is reconstructed when a replay is opened and kept in
+# memory, so that any board can be reached by replaying at most about as many records. The writer flushes
+# the file at the same interval, so that a game in progress can be replayed.
+CHECKPOINT_INTERVAL = 64
+
+_HEADER = struct.Struct('<4sBBB')
+
+
+# Function to encode a single record
+def encode(code:int, pos:tuple=(0, 0), tile:int=1, size:int=1) -> int:
+    return (code << CODE_SHIFT) | (TILE_BIT if tile == 2 else 0) | (pos[0]*size + pos[1])
+
+
+# Function to decode a single record into (code, flat position, tile exponent)
+def decode(record:int) -> tuple[int, int, int]:
+    return record >> CODE_SHIFT, record & POS_MASK, 2 if record & TILE_BIT else 1
+
+
+class ReplayWriter:
+    # The file can be a path or a binary file object (which is not closed by the writer)
+    def __init__(self, file, size:int, seed_seq:SeedSequence=None):
+        if size > MAX_SIZE:
+            raise ValueError(f"Replays support boards of size at most {MAX_SIZE}")
+        if seed_seq is not None and not isinstance(seed_seq.entropy, int):
+            raise ValueError("Only seeds with integer entropy can be recorded!")
+
+        self.size = size
+        self.num_records = 0
+        self._owned = isinstance(file, (str, bytes)) or hasattr(file, '__fspath__')
+        self.file = open(file, 'wb') if self._owned else file
+
+        entropy = seed_seq.entropy if seed_seq is not None else 0
+        spawn_key = seed_seq.spawn_key if seed_seq is not None else ()
+        entropy_bytes = entropy.to_bytes((entropy.bit_length() + 7) // 8, 'little')
+
+        self.file.write(_HEADER.pack(MAGIC, VERSION, size, len(entropy_bytes)) + entropy_bytes
+                        + struct.pack(f'<B{len(spawn_key)}I', len(spawn_key), *spawn_key))
+
+
+    def _write(self, record:int) -> None:
+        self.file.write(record.to_bytes(2, 'little'))
+        self.num_records += 1
+        if self.num_records % CHECKPOINT_INTERVAL == 0:
+            self.file.flush()
+
+
+    # Functions to record the events of a game
+    def spawn(self, pos:tuple, tile:int) -> None:
+        self._write(encode(SPAWN, pos, tile, self.size))
+
+    def move(self, move_id:int, pos:tuple, tile:int) -> None:
+        self._write(encode(move_id, pos, tile, self.size))
+
+    def undo(self) -> None:
+        self._write(encode(0))
+
+    def redo(self) -> None:
+        self._write(encode(REDO))
+
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+    def close(self) -> None:
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+
+class Replay:
+    def __init__(self, data:bytes):
+        magic, version, self.size, num_entropy = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a replay file!")
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay version {version}!")
+
+        offset = _HEADER.size
+        self.entropy = int.from_bytes(data[offset:offset + num_entropy], 'little')
+        offset += num_entropy
+        num_keys = data[offset]
+        self.spawn_key = struct.unpack_from(f'<{num_keys}I', data, offset + 1)
+        offset += 1 + 4*num_keys
+
+        # A file that is still being written may end in the middle of a record
+        num_records = (len(data) - offset) // 2
+        self.records = np.frombuffer(data, dtype='<u2', count=num_records, offset=offset)
+
+        self._index()
+        self._board = Board2048(self.size, seed=0)
+
+        # Checkpoints, in a single pass over the records (each one is played forward from the previous one)
+        self.checkpoints = {}
+        for r in range(CHECKPOINT_INTERVAL - 1, len(self.records), CHECKPOINT_INTERVAL):
+            if self.state[r] >= 0:
+                self.checkpoints[self.state[r]] = self._board_after(self.state[r]).copy()
+
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+
+    # Seed sequence of the recorded game
+    @property
+    def seed_seq(self) -> SeedSequence:
+        return SeedSequence(self.entropy, spawn_key=self.spawn_key)
+
+
+    # Function to work out which board every record leads to (without playing any move):
+    #  - parent[r] is the record after which the move or spawn r was made (-1 for the empty board)
+    #  - state[r] is the move or spawn record after which the board is the same as after record r
+    #    (for an undo, this is the record before the undone move, and for a redo the redone move)
+    def _index(self) -> None:
+        codes = (self.records >> CODE_SHIFT).tolist()
+        self.parent = [-1] * len(codes)
+        self.state = [-1] * len(codes)
+
+        cur = -1
+        done = []   # Moves that can be undone
+        undone = [] # Moves that can be redone
+        for r, code in enumerate(codes):
+            if code == 0:
+                if done:
+                    undone.append(done.pop())
+                    cur = self.parent[undone[-1]]
+            elif code == REDO:
+                if undone:
+                    done.append(undone.pop())
+                    cur = done[-1]
+            elif code == SPAWN or 1 <= code <= 4:
+                self.parent[r] = cur
+                cur = r
+                if code != SPAWN:
+                    done.append(r)
+                    undone.clear()
+            else:
+                raise ValueError(f"Invalid replay record {code}!")
+            self.state[r] = cur
+
+        self.num_start = next((r for r, code in enumerate(codes) if code != SPAWN), len(codes))
+
+
+    # Number of turns (records after the initial spawns)
+    def __len__(self) -> int:
+        return len(self.records) - self.num_start
+
+
+    # Function to reconstruct the board after turn n (n=0 is the initial position)
+    # Returns an array of exponents, as in Board2048.board
+    def board_at(self, n:int) -> np.ndarray:
+        if n < 0 or n > len(self):
+            raise ValueError(f"Turn {n} is not in the replay (0 to {len(self)})!")
+        r = self.state[self.num_start + n - 1] if self.num_start + n > 0 else -1
+        return self._board_after(r).copy()
+
+
+    # Function to reconstruct the board after the move or spawn record r (-1 for the empty board)
+    # Walks back to the nearest checkpoint, then plays the records forward. Returns the internal board.
+    def _board_after(self, r:int) -> np.ndarray:
+        chain = []
+        while r >= 0 and r not in self.checkpoints:
+            chain.append(r)
+            r = self.parent[r]
+
+        board = self._board
+        if r >= 0:
+            board.load(self.checkpoints[r])
+        else:
+            board.load(0)
+
+        for r in reversed(chain):
+            code, pos, tile = decode(int(self.records[r]))
+            if code != SPAWN:
+                board.move(code)
+            board.place_tile(divmod(pos, self.size), tile)
+
+        return board.board
+
+
+    # Generator over the events of the game as (turn, code, position, tile exponent)
+    def events(self):
+        for r, record in enumerate(self.records.tolist()):
+            code, pos, tile = decode(record)
+            yield r - self.num_start + 1, code, divmod(pos, self.size), tile
+
+
+
+# Symbol of a tile for printing (as in the terminal interface)
+def _symbol(exponent:int) -> str:
+    if exponent < 0:
+        return "??"
+    return str(2**exponent) if exponent else "."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m play2048.replay", description="Show a recorded game")
+    parser.add_argument("file", help="replay file")
+    parser.add_argument("--move", type=int, help="turn to show (default: the last one)")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.file)
+    n = len(replay) if args.move is None else args.move
+
+    print(f"Board size {replay.size}, seed {replay.entropy}"
+          + (f" (spawn key {replay.spawn_key})" if replay.spawn_key else "") + f", {len(replay)} turns")
+    print(f"Board after turn {n}:")
+    for row in replay.board_at(n):
+        print(' '.join(f"{_symbol(int(x)):>6}" for x in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import copy
+
+import numpy as np
+from numpy.random import SeedSequence
+
+# Description: This file contains the random number streams used to spawn new tiles.
+# Every board owns its own streams, derived from a seed (or a numpy SeedSequence), so that games are
+# reproducible and independent of each other, also across processes. For a pool of workers, the
+# streams should be split off a single root seed with spawn_seeds().
+
+PROB_TWO = 0.9
+
+# Number of random numbers drawn from the generators at once
+SPAWN_BLOCK = 256
+
+
+# Function to split a root seed into n independent seed sequences (e.g. one per worker or per game)
+def spawn_seeds(seed, n:int) -> list[SeedSequence]:
+    root = seed if isinstance(seed, SeedSequence) else SeedSequence(seed)
+    return root.spawn(n)
+
+
+class SpawnRNG:
+    def __init__(self, seed=None):
+        self.seed_seq = seed if isinstance(seed, SeedSequence) else SeedSequence(seed)
+
+        # Independent streams for the positions and the values of the new tiles, so that the sequence
+        # of values does not depend on the moves
+        pos_seq, tile_seq = self.seed_seq.spawn(2)
+        self.pos_gen = np.random.default_rng(pos_seq)
+        self.tile_gen = np.random.default_rng(tile_seq)
+
+        self._pos_block = []
+        self._tile_block = []
+
+
+    # Function to draw the index of the free square (out of num_free) and the exponent of a new tile
+    def draw(self, num_free:int) -> tuple[int, int]:
+        # Refill the buffers in blocks, which is much cheaper than drawing the numbers one at a time
+        if not self._pos_block:
+            self._pos_block = self.pos_gen.random(SPAWN_BLOCK).tolist()[::-1]
+            self._tile_block = np.where(self.tile_gen.random(SPAWN_BLOCK) < PROB_TWO, 1, 2).tolist()[::-1]
+
+        return int(self._pos_block.pop() * num_free), self._tile_block.pop()
+
+
+    # Function to make an independent copy of the streams (e.g. for a copy of a board). The copy draws the
+    # same numbers as the original would from this point on, without advancing the original.
+    def clone(self):
+        rng = type(self).__new__(type(self))
+        rng.seed_seq = self.seed_seq
+        rng.pos_gen = copy.deepcopy(self.pos_gen)
+        rng.tile_gen = copy.deepcopy(self.tile_gen)
+        rng._pos_block = self._pos_block.copy()
+        rng._tile_block = self._tile_block.copy()
+        return rng
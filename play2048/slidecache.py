@@ -0,0 +1,102 @@
+from collections import OrderedDict
+
+# Description: This file contains the rules for sliding a single line of tiles, and the SlideCache class,
+# a bounded LRU cache of slid lines. On small boards only a few thousand distinct lines occur in practice,
+# so almost every line of a move is found in the cache instead of being slid again.
+
+DEFAULT_CAPACITY = 65536
+
+
+# Function to slide a line of tile exponents towards its first entry
+# Each tile merges at most once, with the nearest tile (in the scan order) of the same value.
+# Tiles with an exponent of max_exponent (if given) are never merged.
+# Returns:
+#  - the new line (as a tuple)
+#  - a tuple of tile moves (source, destination, merge_flag), in line coordinates, for every tile that moved
+#  - the score of the slide, i.e. the sum of the values of the merged tiles
+def slide_line(cells, max_exponent=None):
+    out = [0] * len(cells)
+    moves = []
+    score = 0
+    new_pos = 0
+    prev_val = 0
+
+    for pos, val in enumerate(cells):
+        # Only need to do something if the square is nonempty
+        if val != 0:
+            if prev_val != 0 and val == prev_val and (max_exponent is None or val < max_exponent):
+                # Merge tiles
+                out[new_pos-1] += 1
+                score += 2**out[new_pos-1]
+                prev_val = 0
+                moves.append((pos, new_pos-1, True))
+            else:
+                # Move tile (only added to the list of moves if it has moved)
+                out[new_pos] = val
+                if new_pos != pos:
+                    moves.append((pos, new_pos, False))
+                prev_val = val
+                new_pos += 1
+
+    return tuple(out), tuple(moves), score
+
+
+class SlideCache:
+    def __init__(self, capacity:int=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Cache capacity must be at least 1")
+
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    # Function to slide a line (given as a tuple of exponents), using the cached result if available
+    # Returns the same triple as slide_line
+    def slide(self, line:tuple) -> tuple:
+        result = self.entries.get(line)
+        if result is not None:
+            self.hits += 1
+            self.entries.move_to_end(line)
+            return result
+
+        self.misses += 1
+        result = slide_line(line)
+        self.entries[line] = result
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+    def stats(self) -> dict:
+        return {
+            'capacity': self.capacity,
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+# Cache shared by all the boards that are not given their own
+DEFAULT_CACHE = SlideCache()
@@ -0,0 +1,152 @@
+import numpy as np
+
+from .bitboard import transpose as transpose_packed
+
+# Description: This file contains the symmetries of the board. A square board has 8 symmetries (the
+# rotations and reflections of the square), and the game is invariant under all of them: moving a board
+# and then transforming it gives the same result as transforming it and then making the transformed move.
+#
+# Symmetric positions can therefore share the entries of caches and transposition tables. Every board is
+# mapped to a canonical representative (the transformed board with the smallest bytes), together with
+# the transform that maps the board to it.
+#
+# The transform k = 4*transpose + 2*flip_rows + flip_cols first transposes the board (if transpose),
+# then reverses the order of the rows (if flip_rows) and then the order of the columns (if flip_cols).
+
+NUM_TRANSFORMS = 8
+
+# Direction in which the tiles move for each move ID, as (row, column) steps
+MOVE_VECTORS = {1: (-1, 0), 2: (0, -1), 3: (1, 0), 4: (0, 1)}
+
+
+# Function to split a transform into its (transpose, flip_rows, flip_cols) flags
+def _flags(k:int) -> tuple[bool, bool, bool]:
+    return bool(k & 4), bool(k & 2), bool(k & 1)
+
+
+# Function to apply the transform k to a board (or to a stack of boards along the last two axes)
+# Returns a view of the board
+def transform(board:np.ndarray, k:int) -> np.ndarray:
+    transpose, flip_rows, flip_cols = _flags(k)
+    if transpose:
+        board = board.swapaxes(-1, -2)
+    if flip_rows:
+        board = board[..., ::-1, :]
+    if flip_cols:
+        board = board[..., ::-1]
+    return board
+
+
+# Function to compute the tables of the moves:
+#  - MOVE_MAP[k][m] is the move on the transformed board that corresponds to the move m on the board
+#  - INVERSE_MOVE_MAP[k][m] is the move on the board that corresponds to the move m on the transformed board
+def _move_maps() -> tuple[list, list]:
+    moves = {vec: move_id for move_id, vec in MOVE_VECTORS.items()}
+    move_map, inverse_map = [], []
+    for k in range(NUM_TRANSFORMS):
+        transpose, flip_rows, flip_cols = _flags(k)
+        forward = {}
+        for move_id, (di, dj) in MOVE_VECTORS.items():
+            if transpose:
+                di, dj = dj, di
+            forward[move_id] = moves[(-di if flip_rows else di, -dj if flip_cols else dj)]
+        move_map.append(forward)
+        inverse_map.append({new: old for old, new in forward.items()})
+    return move_map, inverse_map
+
+MOVE_MAP, INVERSE_MOVE_MAP = _move_maps()
+
+
+# Functions to translate a move ID through the transform k (and back)
+def transform_move(move_id:int, k:int) -> int:
+    return MOVE_MAP[k][move_id]
+
+def inverse_move(move_id:int, k:int) -> int:
+    return INVERSE_MOVE_MAP[k][move_id]
+
+
+# Function to compute the canonical representative of a board and the transform k that maps the board
+# to it (transform(board, k) == canonical). Works for any board size.
+def canonical(board:np.ndarray) -> tuple[np.ndarray, int]:
+    key, k = _canonical_bytes(board)
+    return np.frombuffer(key, dtype=board.dtype).reshape(board.shape).copy(), k
+
+
+# Function to compute a hashable key that is the same for all the symmetric versions of a board
+def canonical_key(board:np.ndarray) -> bytes:
+    return _canonical_bytes(board)[0]
+
+
+# PERMUTATIONS[size][k] are the flat indices of the squares of a board in the order of the transform k
+PERMUTATIONS = {}
+
+
+def _canonical_bytes(board:np.ndarray) -> tuple[bytes, int]:
+    size = board.shape[-1]
+    perm = PERMUTATIONS.get(size)
+    if perm is None:
+        flat = np.arange(size * size).reshape(size, size)
+        perm = PERMUTATIONS[size] = np.stack([transform(flat, k).ravel() for k in range(NUM_TRANSFORMS)])
+
+    # A single gather of all the transformed boards, sliced into the bytes of the individual boards
+    raw = board.ravel()[perm].tobytes()
+    n = len(raw) // NUM_TRANSFORMS
+    keys = [raw[k*n:(k+1)*n] for k in range(NUM_TRANSFORMS)]
+    k = min(range(NUM_TRANSFORMS), key=keys.__getitem__)
+    return keys[k], k
+
+
+# Function to canonicalize a stack of boards of shape (N, size, size) at once (e.g. to remove the
+# duplicates from a dataset). Returns the canonical boards and the transform of every board, which agree
+# with canonical() for the individual boards.
+def canonical_batch(boards:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    num_boards = len(boards)
+    rows = np.arange(num_boards)
+
+    best = np.ascontiguousarray(boards).reshape(num_boards, -1)
+    best_k = np.zeros(num_boards, dtype=np.int8)
+
+    for k in range(1, NUM_TRANSFORMS):
+        cand = np.ascontiguousarray(transform(boards, k)).reshape(num_boards, -1)
+
+        # Compare the raw bytes of the boards (as canonical() does, for any dtype), at the first byte in
+        # which they differ
+        cand_bytes, best_bytes = cand.view(np.uint8), best.view(np.uint8)
+        diff = cand_bytes != best_bytes
+        first = diff.argmax(axis=1)
+        smaller = diff.any(axis=1) & (cand_bytes[rows, first] < best_bytes[rows, first])
+
+        best = np.where(smaller[:, None], cand, best)
+        best_k[smaller] = k
+
+    return best.reshape(boards.shape), best_k
+
+
+# Fast path for the packed 4x4 boards of BitBoard2048 (one nibble per square, see bitboard.py)
+# The representative is the transformed board with the smallest packed value.
+def transform_packed(x:int, k:int) -> int:
+    transpose, flip_rows, flip_cols = _flags(k)
+    if transpose:
+        x = transpose_packed(x)
+    if flip_rows:
+        x = _flip_rows_packed(x)
+    if flip_cols:
+        x = _flip_cols_packed(x)
+    return x
+
+
+def canonical_packed(x:int) -> tuple[int, int]:
+    best = (x, 0)
+    for y, k in ((x, 0), (transpose_packed(x), 4)):
+        rows = _flip_rows_packed(y)
+        best = min(best, (y, k), (rows, k + 2), (_flip_cols_packed(y), k + 1), (_flip_cols_packed(rows), k + 3))
+    return best
+
+
+def _flip_rows_packed(x:int) -> int:
+    return ((x & 0xFFFF) << 48) | ((x & 0xFFFF0000) << 16) | ((x >> 16) & 0xFFFF0000) | (x >> 48)
+
+
+def _flip_cols_packed(x:int) -> int:
+    return (((x & 0x000F000F000F000F) << 12) | ((x & 0x00F000F000F000F0) << 4)
+            | ((x >> 4) & 0x00F000F000F000F0) | ((x >> 12) & 0x000F000F000F000F))
@@ -0,0 +1,185 @@
+import argparse
+import importlib
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from time import perf_counter, process_time
+
+from .board import DEFAULT_SIZE
+from .game import Game
+
+# Description: This file contains a tournament runner, which plays many seeded headless games with one
+# or more AI players on a pool of worker processes and aggregates the results.
+#
+# Players are specified as "module:Class" (or "module.Class"), where the class has a constructor without
+# arguments and a method next_move(board). For example:
+#
+#   python -m play2048.tournament play2048.player:AIPlayer --games 1000 --workers 8
+
+WIN_TILE = 2048
+DEFAULT_PLAYER = "play2048.player:AIPlayer"
+
+# Number of games sent to a worker in a single task. Larger chunks reduce the inter-process overhead,
+# smaller chunks stream the results back more often and balance the load better at the end of a run.
+CHUNK_SIZE = 8
+
+
+# Result of a single tournament game
+@dataclass
+class GameRecord:
+    player: str             # Player specification
+    seed: int               # Seed of the game
+    moves: int              # Number of moves played
+    max_tile: int           # Value of the largest tile on the final board
+    score: int              # Final score
+    cpu_time: float         # CPU time spent on the game by the worker (in seconds)
+
+
+# Aggregated results of a single player
+@dataclass
+class PlayerStats:
+    player: str
+    games: int = 0
+    wins: int = 0
+    total_moves: int = 0
+    total_score: int = 0
+    cpu_time: float = 0.0
+    max_tiles: Counter = field(default_factory=Counter)
+
+    def add(self, record:GameRecord) -> None:
+        self.games += 1
+        self.wins += record.max_tile >= WIN_TILE
+        self.total_moves += record.moves
+        self.total_score += record.score
+        self.cpu_time += record.cpu_time
+        self.max_tiles[record.max_tile] += 1
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    @property
+    def mean_moves(self) -> float:
+        return self.total_moves / self.games if self.games else 0.0
+
+    @property
+    def mean_score(self) -> float:
+        return self.total_score / self.games if self.games else 0.0
+
+    # Throughput of a single core (games per CPU second of the workers)
+    @property
+    def games_per_core_sec(self) -> float:
+        return self.games / self.cpu_time if self.cpu_time else 0.0
+
+
+# Function to import a player class from a specification of the form "module:Class" or "module.Class"
+def load_player(spec:str) -> type:
+    module_name, sep, class_name = spec.partition(':')
+    if not sep:
+        module_name, _, class_name = spec.rpartition('.')
+    if not module_name or not class_name:
+        raise ValueError(f"Invalid player specification '{spec}'! Expected 'module:Class'")
+
+    player_cls = getattr(importlib.import_module(module_name), class_name, None)
+    if player_cls is None:
+        raise ValueError(f"Module '{module_name}' has no player class '{class_name}'")
+    return player_cls
+
+
+# Function to play a single seeded headless game (recorded to the replay file, if one is given)
+def play_game(player_cls:type, seed:int, size:int=DEFAULT_SIZE, bitboard:bool=False, replay=None) -> tuple:
+    # Players that use the module-level random number generator are seeded as well
+    random.seed(seed)
+
+    game = Game(size=size, bitboard=bitboard, headless=True, player=player_cls(), seed=seed, replay=replay)
+
+    start = process_time()
+    result = game.run()
+    return result.moves, result.max_tile, result.score, process_time() - start
+
+
+# Path of the replay file of a game in the directory replay_dir
+def replay_path(replay_dir:str, spec:str, seed:int) -> str:
+    return os.path.join(replay_dir, f"{spec.replace(':', '.')}-{seed}.rpl")
+
+
+# Worker task: play the games with the given seeds
+def _play_chunk(spec:str, seeds:list, size:int, bitboard:bool, replay_dir:str=None) -> list[GameRecord]:
+    player_cls = load_player(spec)
+    return [GameRecord(spec, seed, *play_game(player_cls, seed, size, bitboard,
+                                              replay_path(replay_dir, spec, seed) if replay_dir else None))
+            for seed in seeds]
+
+
+# Generator that plays num_games games per player on a pool of worker processes and yields the
+# records of the individual games as they finish (not necessarily in order).
+# The seeds of the games are base_seed, base_seed+1, ..., so that all players face the same boards.
+# If replay_dir is given, every game is recorded to a replay file in that directory.
+def iter_games(specs:list, num_games:int, base_seed:int=0, workers:int=None, size:int=DEFAULT_SIZE,
+               bitboard:bool=False, chunk_size:int=CHUNK_SIZE, replay_dir:str=None):
+    # Check the specifications in the main process, so that typos fail fast
+    for spec in specs:
+        load_player(spec)
+
+    seeds = list(range(base_seed, base_seed + num_games))
+    chunks = [(spec, seeds[i:i+chunk_size]) for i in range(0, num_games, chunk_size) for spec in specs]
+
+    if replay_dir:
+        os.makedirs(replay_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_play_chunk, spec, chunk, size, bitboard, replay_dir) for spec, chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+# Function to run a tournament and return the statistics for every player (in the order of specs)
+# The callback (if any) is called with every GameRecord as it arrives
+def run_tournament(specs:list, num_games:int, base_seed:int=0, workers:int=None, size:int=DEFAULT_SIZE,
+                   bitboard:bool=False, callback=None, replay_dir:str=None) -> dict[str, PlayerStats]:
+    stats = {spec: PlayerStats(spec) for spec in specs}
+    for record in iter_games(specs, num_games, base_seed, workers, size, bitboard, replay_dir=replay_dir):
+        stats[record.player].add(record)
+        if callback is not None:
+            callback(record)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m play2048.tournament",
+                                     description="Evaluate AI players over many seeded headless games")
+    parser.add_argument("players", nargs="*", default=[DEFAULT_PLAYER], help="player classes as module:Class")
+    parser.add_argument("--games", type=int, default=100, help="number of games per player")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="size of the board")
+    parser.add_argument("--bitboard", action="store_true", help="use the packed 4x4 bitboard engine")
+    parser.add_argument("--replay-dir", help="directory in which every game is recorded as a replay file")
+    parser.add_argument("--verbose", action="store_true", help="print every game as it finishes")
+    args = parser.parse_args(argv)
+
+    def report(record):
+        print(f"{record.player} seed={record.seed} moves={record.moves} "
+              f"max_tile={record.max_tile} score={record.score}")
+
+    start = perf_counter()
+    stats = run_tournament(args.players, args.games, args.seed, args.workers, args.size, args.bitboard,
+                           callback=report if args.verbose else None, replay_dir=args.replay_dir)
+    elapsed = perf_counter() - start
+
+    total_games = sum(s.games for s in stats.values())
+    print(f"Played {total_games} games in {elapsed:.2f}s on {args.workers} workers "
+          f"({total_games/elapsed:.1f} games/s, {total_games/elapsed/args.workers:.1f} games/s per core)")
+
+    for s in stats.values():
+        print(f"\n{s.player}")
+        print(f"  win rate: {100*s.win_rate:.1f}%, mean moves: {s.mean_moves:.1f}, mean score: {s.mean_score:.1f}, "
+              f"{s.games_per_core_sec:.1f} games/s per core")
+        for tile in sorted(s.max_tiles):
+            print(f"  {tile:>6}: {s.max_tiles[tile]}")
+
+
+if __name__ == "__main__":
+    main()